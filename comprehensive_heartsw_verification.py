@@ -1,139 +1,165 @@
 #!/usr/bin/env python3
 
 import sys
+import io
 import json
 import subprocess
 import tempfile
 import os
+import atexit
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
+import numpy as np
 import heartpy as hp
 import heartoo as ho
 
+# orjson parses HeartSW's large peaklist/RR arrays much faster; fall back to the stdlib
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 print("🔬 Comprehensive HeartSW Verification - All Datasets")
 print("=" * 60)
 
-def run_heartsw_on_data(data, sample_rate):
-    """Run HeartSW on data and return results"""
-    # Create temporary CSV file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as temp_csv:
-        temp_csv.write("timer,hr\n")
-        for i, value in enumerate(data):
-            temp_csv.write(f"{i},{value}\n")
-        temp_csv_path = temp_csv.name
+# One scratch directory for the whole run; each dataset overwrites its own files in place
+_HSW_DIR = tempfile.mkdtemp(prefix='hsw_')
+atexit.register(shutil.rmtree, _HSW_DIR, ignore_errors=True)
 
-    # Create temporary JSON output file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp_json:
-        temp_json_path = temp_json.name
+HEARTSW_DIR = "/Volumes/workplace/personal/HeartOO/heartsw"
 
+@lru_cache(maxsize=None)
+def build_heartsw_cli():
+    """Build HeartSWCLI once in release mode and return the command prefix to run it
+
+    HeartSWCLI has no stdin/server mode, so the next best thing is to skip the
+    package resolution and build check `swift run` repeats on every invocation.
+    Falls back to `swift run` if the release build is unavailable.
+    """
     try:
-        # Run HeartSW CLI
-        heartsw_dir = "/Volumes/workplace/personal/HeartOO/heartsw"
-        cmd = [
-            "swift", "run", "HeartSWCLI", "process",
-            temp_csv_path,
-            "--sample-rate", str(sample_rate),
-            "--output", temp_json_path
-        ]
-
-        result = subprocess.run(cmd, cwd=heartsw_dir, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            print(f"   ⚠️ HeartSW CLI error: {result.stderr}")
-            return None
-
-        # Load results
-        with open(temp_json_path, 'r') as f:
-            return json.load(f)
-
-    finally:
-        # Clean up temporary files
-        try:
-            os.unlink(temp_csv_path)
-            os.unlink(temp_json_path)
-        except:
-            pass
-
-def verify_dataset(data_idx, data_name, sample_rate):
+        build = subprocess.run(["swift", "build", "--configuration", "release", "--product", "HeartSWCLI"],
+                               cwd=HEARTSW_DIR, capture_output=True, text=True)
+    except OSError:
+        build = None
+    binary = os.path.join(HEARTSW_DIR, ".build", "release", "HeartSWCLI")
+    if build is not None and build.returncode == 0 and os.access(binary, os.X_OK):
+        return [binary]
+    return ["swift", "run", "HeartSWCLI"]
+
+# Datasets are verified concurrently; only the first caller may run the build
+_BUILD_LOCK = threading.Lock()
+
+def heartsw_command():
+    """Return the HeartSWCLI command prefix, building the CLI on first use"""
+    with _BUILD_LOCK:
+        return build_heartsw_cli()
+
+def run_heartsw_on_data(data, sample_rate, out=sys.stdout, tag=0):
+    """Run HeartSW on data and return results"""
+    csv_path = os.path.join(_HSW_DIR, f"input_{tag}.csv")
+    json_path = os.path.join(_HSW_DIR, f"output_{tag}.json")
+
+    # HeartSWCLI only reads files, so serialize the whole signal in one savetxt call.
+    # %.17g round-trips float64 exactly, so HeartSW sees the same input as HeartPy/HeartOO.
+    with open(csv_path, 'w') as temp_csv:
+        rows = np.column_stack((np.arange(len(data)), data))
+        np.savetxt(temp_csv, rows, fmt=('%d', '%.17g'), delimiter=',',
+                   header='timer,hr', comments='')
+
+    # Truncate any previous output so a failed run can't return stale results
+    open(json_path, 'w').close()
+
+    # Run HeartSW CLI
+    cmd = heartsw_command() + [
+        "process",
+        csv_path,
+        "--sample-rate", str(sample_rate),
+        "--output", json_path
+    ]
+
+    result = subprocess.run(cmd, cwd=HEARTSW_DIR, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        print(f"   ⚠️ HeartSW CLI error: {result.stderr}", file=out)
+        return None
+
+    # Load results
+    with open(json_path, 'r') as f:
+        contents = f.read()
+    if not contents:
+        print(f"   ⚠️ HeartSW CLI wrote no results: {result.stdout}", file=out)
+        return None
+    return _json_loads(contents)
+
+@lru_cache(maxsize=8)
+def load_example(data_idx):
+    """Load a HeartPy example dataset once per session"""
+    return hp.load_exampledata(data_idx)
+
+def int_match(ho_val, sw_val):
+    """Compare an integer metric that should match exactly"""
+    return {
+        'match': ho_val == sw_val,
+        'diff': abs(ho_val - sw_val),
+        'heartoo': ho_val,
+        'heartsw': sw_val
+    }
+
+def accuracy_match(ho_val, sw_val):
+    """Compare a continuous metric as the percentage agreement between both values"""
+    largest = max(ho_val, sw_val)
+    return {
+        'accuracy': (min(ho_val, sw_val) / largest) * 100 if largest > 0 else 0,
+        'diff': abs(ho_val - sw_val),
+        'heartoo': ho_val,
+        'heartsw': sw_val
+    }
+
+def verify_dataset(data_idx, data_name, sample_rate, out=sys.stdout):
     """Verify HeartSW results against HeartOO ground truth"""
-    print(f"\n📊 {data_name} Verification:")
+    print(f"\n📊 {data_name} Verification:", file=out)
 
     # Load original data and get HeartOO ground truth
-    data, _ = hp.load_exampledata(data_idx)
+    data, _ = load_example(data_idx)
     wd_heartoo, m_heartoo = ho.process(data, sample_rate=sample_rate)
 
     # Run HeartSW dynamically
-    heartsw_data = run_heartsw_on_data(data, sample_rate)
+    heartsw_data = run_heartsw_on_data(data, sample_rate, out, tag=data_idx)
 
     if heartsw_data is None:
-        print(f"   ❌ Failed to run HeartSW on {data_name}")
+        print(f"   ❌ Failed to run HeartSW on {data_name}", file=out)
         return {'status': '❌ ERROR', 'sdnn_accuracy': 0}
 
     # Key metrics comparison
-    metrics = {
-        'peaks': {
-            'heartoo': len(wd_heartoo['peaklist']),
-            'heartsw': len(heartsw_data['workingData']['peaklist'])
-        },
-        'raw_rr': {
-            'heartoo': len(wd_heartoo['RR_list']),
-            'heartsw': len(heartsw_data['workingData']['RR_list'])
-        },
-        'corrected_rr': {
-            'heartoo': len(wd_heartoo['RR_list_cor']),
-            'heartsw': len(heartsw_data['workingData']['RR_list_cor'])
-        },
-        'sdnn': {
-            'heartoo': m_heartoo['sdnn'],
-            'heartsw': heartsw_data['measures']['sdnn']
-        },
-        'rmssd': {
-            'heartoo': m_heartoo['rmssd'],
-            'heartsw': heartsw_data['measures']['rmssd']
-        },
-        'bpm': {
-            'heartoo': m_heartoo['bpm'],
-            'heartsw': heartsw_data['measures']['bpm']
-        }
+    wd_heartsw = heartsw_data['workingData']
+    m_heartsw = heartsw_data['measures']
+
+    # Exact matches (integer metrics) and accuracies (continuous values)
+    results = {
+        'peaks': int_match(len(wd_heartoo['peaklist']), len(wd_heartsw['peaklist'])),
+        'raw_rr': int_match(len(wd_heartoo['RR_list']), len(wd_heartsw['RR_list'])),
+        'corrected_rr': int_match(len(wd_heartoo['RR_list_cor']), len(wd_heartsw['RR_list_cor'])),
+        'sdnn': accuracy_match(m_heartoo['sdnn'], m_heartsw['sdnn']),
+        'rmssd': accuracy_match(m_heartoo['rmssd'], m_heartsw['rmssd']),
+        'bpm': accuracy_match(m_heartoo['bpm'], m_heartsw['bpm'])
     }
 
-    # Calculate accuracies and matches
-    results = {}
-
-    # Exact matches (integer metrics)
-    for metric in ['peaks', 'raw_rr', 'corrected_rr']:
-        ho_val = metrics[metric]['heartoo']
-        sw_val = metrics[metric]['heartsw']
-        results[metric] = {
-            'match': ho_val == sw_val,
-            'diff': abs(ho_val - sw_val),
-            'heartoo': ho_val,
-            'heartsw': sw_val
-        }
-
-    # Accuracy metrics (continuous values)
-    for metric in ['sdnn', 'rmssd', 'bpm']:
-        ho_val = metrics[metric]['heartoo']
-        sw_val = metrics[metric]['heartsw']
-        accuracy = (min(ho_val, sw_val) / max(ho_val, sw_val)) * 100 if max(ho_val, sw_val) > 0 else 0
-        results[metric] = {
-            'accuracy': accuracy,
-            'diff': abs(ho_val - sw_val),
-            'heartoo': ho_val,
-            'heartsw': sw_val
-        }
-
     # Display results
-    print(f"   Peak Detection:")
-    print(f"      Peaks: {results['peaks']['heartsw']}/{results['peaks']['heartoo']} {'✅' if results['peaks']['match'] else '❌'}")
+    print(f"   Peak Detection:", file=out)
+    print(f"      Peaks: {results['peaks']['heartsw']}/{results['peaks']['heartoo']} {'✅' if results['peaks']['match'] else '❌'}", file=out)
 
-    print(f"   RR Processing:")
-    print(f"      Raw RR: {results['raw_rr']['heartsw']}/{results['raw_rr']['heartoo']} {'✅' if results['raw_rr']['match'] else '❌'}")
-    print(f"      Corrected RR: {results['corrected_rr']['heartsw']}/{results['corrected_rr']['heartoo']} {'✅' if results['corrected_rr']['match'] else '❌'}")
+    print(f"   RR Processing:", file=out)
+    print(f"      Raw RR: {results['raw_rr']['heartsw']}/{results['raw_rr']['heartoo']} {'✅' if results['raw_rr']['match'] else '❌'}", file=out)
+    print(f"      Corrected RR: {results['corrected_rr']['heartsw']}/{results['corrected_rr']['heartoo']} {'✅' if results['corrected_rr']['match'] else '❌'}", file=out)
 
-    print(f"   HRV Measures:")
-    print(f"      SDNN: {results['sdnn']['heartsw']:.1f}/{results['sdnn']['heartoo']:.1f}ms ({results['sdnn']['accuracy']:.1f}%)")
-    print(f"      RMSSD: {results['rmssd']['heartsw']:.1f}/{results['rmssd']['heartoo']:.1f}ms ({results['rmssd']['accuracy']:.1f}%)")
-    print(f"      BPM: {results['bpm']['heartsw']:.1f}/{results['bpm']['heartoo']:.1f} ({results['bpm']['accuracy']:.1f}%)")
+    print(f"   HRV Measures:", file=out)
+    print(f"      SDNN: {results['sdnn']['heartsw']:.1f}/{results['sdnn']['heartoo']:.1f}ms ({results['sdnn']['accuracy']:.1f}%)", file=out)
+    print(f"      RMSSD: {results['rmssd']['heartsw']:.1f}/{results['rmssd']['heartoo']:.1f}ms ({results['rmssd']['accuracy']:.1f}%)", file=out)
+    print(f"      BPM: {results['bpm']['heartsw']:.1f}/{results['bpm']['heartoo']:.1f} ({results['bpm']['accuracy']:.1f}%)", file=out)
 
     # Overall assessment
     peak_excellent = results['peaks']['diff'] <= 1
@@ -151,7 +177,7 @@ def verify_dataset(data_idx, data_name, sample_rate):
     else:
         status = "⚠️ NEEDS WORK"
 
-    print(f"   Status: {status}")
+    print(f"   Status: {status}", file=out)
 
     return {
         'status': status,
@@ -167,14 +193,24 @@ datasets = [
     (2, "data3.csv", 100.0)
 ]
 
-results = []
-for data_idx, name, sample_rate in datasets:
+def run_dataset(data_idx, name, sample_rate):
+    """Verify one dataset, buffering its report so parallel runs don't interleave"""
+    out = io.StringIO()
     try:
-        result = verify_dataset(data_idx, name, sample_rate)
-        results.append((name, result))
+        result = verify_dataset(data_idx, name, sample_rate, out)
     except Exception as e:
-        print(f"\n❌ Error testing {name}: {e}")
-        results.append((name, {'status': '❌ ERROR', 'sdnn_accuracy': 0}))
+        print(f"\n❌ Error testing {name}: {e}", file=out)
+        result = {'status': '❌ ERROR', 'sdnn_accuracy': 0}
+    return result, out.getvalue()
+
+# Datasets are independent and mostly wait on the HeartSW subprocess, so run them concurrently
+results = []
+with ThreadPoolExecutor(max_workers=len(datasets)) as executor:
+    futures = [executor.submit(run_dataset, *dataset) for dataset in datasets]
+    for (_, name, _), future in zip(datasets, futures):
+        result, report = future.result()
+        print(report, end='')
+        results.append((name, result))
 
 # Overall summary
 print(f"\n" + "="*60)
@@ -1,78 +1,137 @@
 #!/usr/bin/env python3
 
 import sys
+from functools import lru_cache
 import numpy as np
 import heartpy as hp
-from heartpy.datautils import rolling_mean
-from heartpy.peakdetection import detect_peaks
 
 print("🔬 HeartPy Threshold Selection Analysis")
 print("=" * 50)
 
+@lru_cache(maxsize=8)
+def load_example(data_idx):
+    """Load a HeartPy example dataset once per session"""
+    return hp.load_exampledata(data_idx)
+
+def fast_rolling_mean(data, windowsize, sample_rate):
+    """O(N) cumulative-sum rolling mean, shaped like heartpy.datautils.rolling_mean"""
+    data_arr = np.asarray(data)
+    window = int(windowsize * sample_rate)
+
+    csum = np.cumsum(np.insert(data_arr, 0, 0))
+    rol_mean = (csum[window:] - csum[:-window]) / window
+
+    # Fill the 1/2 window gap at both ends with the edge values, as HeartPy does
+    n_missvals = int(abs(len(data_arr) - len(rol_mean)) / 2)
+    rol_mean = np.concatenate((np.full(n_missvals, rol_mean[0]),
+                               rol_mean,
+                               np.full(n_missvals, rol_mean[-1])))
+
+    # Even windows leave the result one sample short; HeartPy pads with a zero
+    if len(rol_mean) < len(data_arr):
+        rol_mean = np.append(rol_mean, 0)
+    return rol_mean
+
+def find_peaks_grid(data, thresholds):
+    """Apply HeartPy's detect_peaks rule to every threshold row in a single pass.
+
+    Samples above each row's threshold are split at the same edges detect_peaks
+    uses, and the first maximum of every segment is a peak. Returns one peak
+    array per threshold row.
+    """
+    rows, cols = np.nonzero(data[None, :] > thresholds)
+    if len(cols) == 0:
+        return [np.array([], dtype=np.int64) for _ in range(len(thresholds))]
+    values = data[cols]
+
+    # Segments start at each row's first sample and at every gap position
+    # (detect_peaks splits at the index *before* the gap, so we do too)
+    same_row = rows[1:] == rows[:-1]
+    gaps = np.where(same_row & (np.diff(cols) > 1))[0]
+    row_starts = np.concatenate((np.array([0]), np.where(~same_row)[0] + 1))
+    starts = np.unique(np.concatenate((row_starts, gaps)))
+
+    # First occurrence of the maximum within each segment
+    seg_max = np.maximum.reduceat(values, starts)
+    seg_id = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+    at_max = np.where(values == seg_max[seg_id])[0]
+    _, first = np.unique(seg_id[at_max], return_index=True)
+    peak_idx = at_max[first]
+
+    # Split the flat peak list back into one array per threshold row
+    splits = np.searchsorted(rows[peak_idx], np.arange(1, len(thresholds)))
+    return np.split(cols[peak_idx].astype(np.int64), splits)
+
+def sweep_rrsd(peaks_grid, n_samples, sample_rate):
+    """RR-interval standard deviation and BPM for every threshold row in one batch.
+
+    Rows without RR intervals get an RRSD of inf, matching HeartPy.
+    """
+    counts = np.array([len(peaklist) for peaklist in peaks_grid])
+    bpm = (counts / (n_samples / sample_rate)) * 60
+
+    # Lay every row's peaks end to end and keep only the intervals within a row
+    peaks = np.concatenate(peaks_grid) if len(peaks_grid) > 0 else np.array([], dtype=np.int64)
+    peak_rows = np.repeat(np.arange(len(peaks_grid)), counts)
+    same_row = peak_rows[1:] == peak_rows[:-1]
+    rr = ((np.diff(peaks) / sample_rate) * 1000.0)[same_row]
+    rr_rows = peak_rows[1:][same_row]
+
+    # Per-row population standard deviation (two-pass, like np.std)
+    n_rr = np.bincount(rr_rows, minlength=len(peaks_grid))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_rr = np.bincount(rr_rows, weights=rr, minlength=len(peaks_grid)) / n_rr
+        sq_dev = np.bincount(rr_rows, weights=(rr - mean_rr[rr_rows]) ** 2, minlength=len(peaks_grid))
+        rrsd = np.where(n_rr > 0, np.sqrt(sq_dev / n_rr), np.inf)
+
+    return rrsd, bpm
+
 def analyze_heartpy_fit_peaks(data_idx, data_name, sample_rate):
     print(f"\n📊 {data_name} Analysis:")
 
     # Load data
-    data, timer = hp.load_exampledata(data_idx)
+    data, timer = load_example(data_idx)
     print(f"   Data points: {len(data)}, Sample rate: {sample_rate} Hz")
 
     # Calculate rolling mean (HeartPy's approach)
-    rol_mean = rolling_mean(data, windowsize=0.75, sample_rate=sample_rate)
+    rol_mean = fast_rolling_mean(data, windowsize=0.75, sample_rate=sample_rate)
 
     # HeartPy's exact threshold list from fit_peaks
     ma_perc_list = [5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120, 150, 200, 300]
 
+    # Materialize every raised rolling mean detect_peaks would build, as one (18, N) block
+    ma_percs = np.asarray(ma_perc_list, dtype=np.float64)
+    thresholds = rol_mean[None, :] + (np.mean(rol_mean / 100) * ma_percs)[:, None]
+    peaks_grid = find_peaks_grid(data, thresholds)
+
     print(f"\n   Testing HeartPy's threshold selection:")
     print(f"   {'Threshold':<10} {'Peaks':<6} {'BPM':<7} {'RRSD':<8} {'Valid'}")
     print(f"   {'-'*10} {'-'*6} {'-'*7} {'-'*8} {'-'*5}")
 
-    rrsd_results = []
-    valid_ma = []
-
-    for ma_perc in ma_perc_list:
-        try:
-            # Use HeartPy's detect_peaks function exactly as fit_peaks does
-            working_data = {}
-            working_data = detect_peaks(data, rol_mean, ma_perc, sample_rate,
-                                        update_dict=True, working_data=working_data)
-
-            peak_count = len(working_data['peaklist'])
-            bpm = (peak_count / (len(data) / sample_rate)) * 60
+    # calc_rr drops a first peak within 150ms (signal might start mid-beat)
+    peaks_grid = [peaklist[1:] if len(peaklist) > 0 and peaklist[0] <= (sample_rate / 1000.0) * 150
+                  else peaklist for peaklist in peaks_grid]
 
-            # Calculate RRSD exactly as HeartPy does
-            if len(working_data['RR_list']) > 0:
-                rrsd = np.std(working_data['RR_list'])
-            else:
-                rrsd = np.inf
+    rrsd, bpm = sweep_rrsd(peaks_grid, len(data), sample_rate)
 
-            rrsd_results.append([rrsd, bpm, ma_perc])
+    # HeartPy's validation criteria
+    valid = (rrsd > 0.1) & (40 <= bpm) & (bpm <= 180)
 
-            # HeartPy's validation criteria
-            is_valid = (rrsd > 0.1) and (40 <= bpm <= 180)
-            if is_valid:
-                valid_ma.append([rrsd, ma_perc])
-
-            status = "✅" if is_valid else "❌"
-            print(f"   {ma_perc:<10} {peak_count:<6} {bpm:<7.1f} {rrsd:<8.1f} {status}")
-
-        except Exception as e:
-            print(f"   {ma_perc:<10} ERROR  {str(e)}")
+    for ma_perc, peaklist, row_rrsd, row_bpm, is_valid in zip(ma_perc_list, peaks_grid, rrsd, bpm, valid):
+        status = "✅" if is_valid else "❌"
+        print(f"   {ma_perc:<10} {len(peaklist):<6} {row_bpm:<7.1f} {row_rrsd:<8.1f} {status}")
 
     # Find HeartPy's choice (minimum RRSD among valid options)
-    if len(valid_ma) > 0:
-        best_choice = min(valid_ma, key=lambda t: t[0])  # Min RRSD
-        best_rrsd, best_threshold = best_choice
+    if valid.any():
+        best_idx = int(np.argmin(np.where(valid, rrsd, np.inf)))
+        best_rrsd, best_threshold = rrsd[best_idx], ma_perc_list[best_idx]
 
         print(f"\n   🎯 HeartPy's Choice:")
         print(f"      Best threshold: {best_threshold}%")
         print(f"      Best RRSD: {best_rrsd:.2f}")
 
         # Test the best choice
-        working_data_final = {}
-        working_data_final = detect_peaks(data, rol_mean, best_threshold, sample_rate,
-                                          update_dict=True, working_data=working_data_final)
-
-        final_peaks = len(working_data_final['peaklist'])
+        final_peaks = len(peaks_grid[best_idx])
         final_bpm = (final_peaks / (len(data) / sample_rate)) * 60
 
         print(f"      Final peaks: {final_peaks}")
@@ -6,6 +6,8 @@ This is a Python script version of the Jupyter notebook example from HeartPy:
 """
 
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Plots are only written to files; skip interactive backend start-up
 import matplotlib.pyplot as plt
 import os
 
@@ -63,45 +65,49 @@ def analyze_ppg_signal():
     print("Processing signal...")
     result = pipeline.process(ppg_signal)
     
+    # Snapshot the result dicts once for reporting (read-only)
+    m_oo = result.measures
+    wd_oo = result.working_data
+    
     # Get results
     print("\nResults:")
-    print(f"Heart Rate: {result.get_measure('bpm'):.2f} BPM")
-    print(f"IBI: {result.get_measure('ibi'):.2f} ms")
-    print(f"SDNN: {result.get_measure('sdnn'):.2f} ms")
-    print(f"RMSSD: {result.get_measure('rmssd'):.2f} ms")
-    print(f"pNN20: {result.get_measure('pnn20')*100:.2f}%")
-    print(f"pNN50: {result.get_measure('pnn50')*100:.2f}%")
+    print(f"Heart Rate: {m_oo['bpm']:.2f} BPM")
+    print(f"IBI: {m_oo['ibi']:.2f} ms")
+    print(f"SDNN: {m_oo['sdnn']:.2f} ms")
+    print(f"RMSSD: {m_oo['rmssd']:.2f} ms")
+    print(f"pNN20: {m_oo['pnn20']*100:.2f}%")
+    print(f"pNN50: {m_oo['pnn50']*100:.2f}%")
     
     print("\nFrequency Domain Measures:")
-    print(f"LF: {result.get_measure('lf'):.2f}")
-    print(f"HF: {result.get_measure('hf'):.2f}")
-    print(f"LF/HF Ratio: {result.get_measure('lf/hf'):.2f}")
+    print(f"LF: {m_oo['lf']:.2f}")
+    print(f"HF: {m_oo['hf']:.2f}")
+    print(f"LF/HF Ratio: {m_oo['lf/hf']:.2f}")
     
     print("\nNonlinear Measures:")
-    print(f"SD1: {result.get_measure('sd1'):.2f} ms")
-    print(f"SD2: {result.get_measure('sd2'):.2f} ms")
-    print(f"SD1/SD2 Ratio: {result.get_measure('sd1/sd2'):.2f}")
+    print(f"SD1: {m_oo['sd1']:.2f} ms")
+    print(f"SD2: {m_oo['sd2']:.2f} ms")
+    print(f"SD1/SD2 Ratio: {m_oo['sd1/sd2']:.2f}")
     
     print("\nBreathing Rate:")
-    print(f"Breathing Rate: {result.get_measure('breathingrate'):.3f} Hz "
-          f"({result.get_measure('breathingrate')*60:.2f} breaths/min)")
+    print(f"Breathing Rate: {m_oo['breathingrate']:.3f} Hz "
+          f"({m_oo['breathingrate']*60:.2f} breaths/min)")
     
     # Plot results
     print("\nGenerating plots...")
     
     # Plot signal with detected peaks
     fig = ho.plot_signal(ppg_signal.data, ppg_signal.sample_rate,
-                       peaks=result.get_working_data('peaklist'),
-                       rejected_peaks=result.get_working_data('removed_beats', []),
+                       peaks=wd_oo['peaklist'],
+                       rejected_peaks=wd_oo.get('removed_beats', []),
                        title="PPG Signal with Detected Peaks",
                        show=False)
     fig.savefig("examples/ppg_signal_peaks.png")
     plt.close()
     
     # Plot Poincaré
-    fig = ho.plot_poincare(result.get_working_data('RR_list_cor'),
-                          sd1=result.get_measure('sd1'),
-                          sd2=result.get_measure('sd2'),
+    fig = ho.plot_poincare(wd_oo['RR_list_cor'],
+                          sd1=m_oo['sd1'],
+                          sd2=m_oo['sd2'],
                           title="HeartOO Poincaré Plot for PPG Signal",
                           show=False)
     fig.savefig("examples/ppg_poincare.png")
@@ -3,9 +3,16 @@ Compare HeartOO and HeartPy using different example datasets.
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 
+# Set HEARTOO_NO_PLOTS=1 (e.g. in CI) to skip matplotlib and all plot output
+SAVE_PLOTS = os.environ.get('HEARTOO_NO_PLOTS') != '1'
+
+if SAVE_PLOTS:
+    import matplotlib
+    matplotlib.use('Agg')  # Plots are only written to files; skip interactive backend start-up
+    import matplotlib.pyplot as plt
+
 try:
     import heartpy as hp
     HEARTPY_AVAILABLE = True
@@ -36,7 +43,7 @@ def process_and_compare(example_num, output_dir='comparison_outputs'):
         return None
     
     # Create output directory if it doesn't exist
-    if not os.path.exists(output_dir):
+    if SAVE_PLOTS and not os.path.exists(output_dir):
         os.makedirs(output_dir)
         
     print(f"\n=== Processing Example {example_num} ===")
@@ -68,18 +75,19 @@ def process_and_compare(example_num, output_dir='comparison_outputs'):
             print(f"LF/HF Ratio: {m_hp['lf/hf']:.2f}")
         print(f"Peaks detected: {len(wd_hp['peaklist'])}")
         
-        # Plot with HeartPy
-        hp.plotter(wd_hp, m_hp, title=f"HeartPy Results - Example {example_num} ({data_type})")
-        plt.savefig(f"{output_dir}/heartpy_example{example_num}.png")
-        plt.close()
-        
-        # Also plot Poincaré
-        try:
-            hp.plot_poincare(wd_hp, m_hp, title=f"HeartPy Poincaré - Example {example_num}")
-            plt.savefig(f"{output_dir}/heartpy_poincare_example{example_num}.png")
+        if SAVE_PLOTS:
+            # Plot with HeartPy
+            hp.plotter(wd_hp, m_hp, title=f"HeartPy Results - Example {example_num} ({data_type})")
+            plt.savefig(f"{output_dir}/heartpy_example{example_num}.png")
             plt.close()
-        except:
-            print("Could not create HeartPy Poincaré plot")
+            
+            # Also plot Poincaré
+            try:
+                hp.plot_poincare(wd_hp, m_hp, title=f"HeartPy Poincaré - Example {example_num}")
+                plt.savefig(f"{output_dir}/heartpy_poincare_example{example_num}.png")
+                plt.close()
+            except:
+                print("Could not create HeartPy Poincaré plot")
             
         hp_success = True
     except Exception as e:
@@ -112,30 +120,37 @@ def process_and_compare(example_num, output_dir='comparison_outputs'):
         pipeline = ho.PipelineBuilder.create_standard_pipeline(calc_freq=True)
         result = pipeline.process(heart_signal)
         
+        # Pull out what the report and both plots reuse
+        sig = heart_signal.data
+        sr = heart_signal.sample_rate
+        peaks = np.asarray(result.get_working_data('peaklist'))
+        rr_cor = np.asarray(result.get_working_data('RR_list_cor'))
+        
         print(f"Heart Rate: {result.get_measure('bpm'):.2f} BPM")
         print(f"SDNN: {result.get_measure('sdnn'):.2f} ms")
         print(f"RMSSD: {result.get_measure('rmssd'):.2f} ms")
         if result.get_measure('lf/hf') is not None:
             print(f"LF/HF Ratio: {result.get_measure('lf/hf'):.2f}")
-        print(f"Peaks detected: {len(result.get_working_data('peaklist'))}")
+        print(f"Peaks detected: {len(peaks)}")
         
-        # Plot with HeartOO
-        fig = ho.plot_signal(heart_signal.data, heart_signal.sample_rate,
-                           peaks=result.get_working_data('peaklist'),
-                           rejected_peaks=result.get_working_data('removed_beats', []),
-                           title=f"HeartOO Results - Example {example_num} ({data_type})",
-                           show=False)
-        fig.savefig(f"{output_dir}/heartoo_example{example_num}.png")
-        plt.close()
-        
-        # Plot Poincaré
-        fig = ho.plot_poincare(result.get_working_data('RR_list_cor'),
-                              sd1=result.get_measure('sd1'),
-                              sd2=result.get_measure('sd2'),
-                              title=f"HeartOO Poincaré - Example {example_num}",
-                              show=False)
-        fig.savefig(f"{output_dir}/heartoo_poincare_example{example_num}.png")
-        plt.close()
+        if SAVE_PLOTS:
+            # Plot with HeartOO
+            fig = ho.plot_signal(sig, sr,
+                               peaks=peaks,
+                               rejected_peaks=result.get_working_data('removed_beats', []),
+                               title=f"HeartOO Results - Example {example_num} ({data_type})",
+                               show=False)
+            fig.savefig(f"{output_dir}/heartoo_example{example_num}.png")
+            plt.close()
+            
+            # Plot Poincaré
+            fig = ho.plot_poincare(rr_cor,
+                                  sd1=result.get_measure('sd1'),
+                                  sd2=result.get_measure('sd2'),
+                                  title=f"HeartOO Poincaré - Example {example_num}",
+                                  show=False)
+            fig.savefig(f"{output_dir}/heartoo_poincare_example{example_num}.png")
+            plt.close()
         
         oo_success = True
     except Exception as e:
@@ -174,7 +189,8 @@ def process_and_compare(example_num, output_dir='comparison_outputs'):
         else:
             print("❌ Results differ by more than 1%")
     
-    print(f"\nPlots saved to {output_dir}/ directory")
+    if SAVE_PLOTS:
+        print(f"\nPlots saved to {output_dir}/ directory")
     
     # Return comparison data
     return {
@@ -3,6 +3,8 @@ Fixed example script for analyzing a PPG signal using HeartOO.
 """
 
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Plots are only written to files; skip interactive backend start-up
 import matplotlib.pyplot as plt
 import os
 
@@ -73,29 +75,33 @@ def analyze_ppg_signal():
     pipeline = ho.PipelineBuilder.create_standard_pipeline(calc_freq=True)
     result = pipeline.process(ppg_signal)
     
+    # Snapshot the result dicts once for reporting (read-only)
+    m_oo = result.measures
+    wd_oo = result.working_data
+    
     # Print results
-    print(f"Heart Rate: {result.get_measure('bpm'):.2f} BPM")
-    print(f"SDNN: {result.get_measure('sdnn'):.2f} ms")
-    print(f"RMSSD: {result.get_measure('rmssd'):.2f} ms")
-    if result.get_measure('lf/hf') is not None:
-        print(f"LF/HF Ratio: {result.get_measure('lf/hf'):.2f}")
-    print(f"Peaks detected: {len(result.get_working_data('peaklist'))}")
+    print(f"Heart Rate: {m_oo['bpm']:.2f} BPM")
+    print(f"SDNN: {m_oo['sdnn']:.2f} ms")
+    print(f"RMSSD: {m_oo['rmssd']:.2f} ms")
+    if m_oo.get('lf/hf') is not None:
+        print(f"LF/HF Ratio: {m_oo['lf/hf']:.2f}")
+    print(f"Peaks detected: {len(wd_oo['peaklist'])}")
     
     # Plot with HeartOO
     fig = ho.plot_signal(ppg_signal.data, ppg_signal.sample_rate,
-                       peaks=result.get_working_data('peaklist'),
-                       rejected_peaks=result.get_working_data('removed_beats', []),
+                       peaks=wd_oo['peaklist'],
+                       rejected_peaks=wd_oo.get('removed_beats', []),
                        title="HeartOO Results (Fixed)",
                        show=False)
     fig.savefig("examples/fixed_ppg_signal.png")
     plt.close()
     
     print("\nComparison:")
-    print(f"BPM Difference (HeartPy vs HeartOO): {abs(m_hp['bpm'] - result.get_measure('bpm')):.4f}")
-    print(f"SDNN Difference: {abs(m_hp['sdnn'] - result.get_measure('sdnn')):.4f}")
-    print(f"RMSSD Difference: {abs(m_hp['rmssd'] - result.get_measure('rmssd')):.4f}")
-    if m_hp['lf/hf'] is not None and result.get_measure('lf/hf') is not None:
-        print(f"LF/HF Difference: {abs(m_hp['lf/hf'] - result.get_measure('lf/hf')):.4f}")
+    print(f"BPM Difference (HeartPy vs HeartOO): {abs(m_hp['bpm'] - m_oo['bpm']):.4f}")
+    print(f"SDNN Difference: {abs(m_hp['sdnn'] - m_oo['sdnn']):.4f}")
+    print(f"RMSSD Difference: {abs(m_hp['rmssd'] - m_oo['rmssd']):.4f}")
+    if m_hp['lf/hf'] is not None and m_oo.get('lf/hf') is not None:
+        print(f"LF/HF Difference: {abs(m_hp['lf/hf'] - m_oo['lf/hf']):.4f}")
     
     print("\nPlots saved to examples/ directory")
 
@@ -19,23 +19,55 @@ The package provides tools to analyze heart rate data including:
 For more information, see the full documentation.
 """
 
+import importlib
+
 from ._version import __version__
 
-# Import core components
-from .core.signal import Signal, HeartRateSignal
-from .core.result import AnalysisResult
+# Public names are imported on first access (PEP 562), so e.g. the
+# compatibility API never pays for importing matplotlib
+_LAZY = {
+    # Core components
+    "Signal": ("heartoo.core.signal", "Signal"),
+    "HeartRateSignal": ("heartoo.core.signal", "HeartRateSignal"),
+    "AnalysisResult": ("heartoo.core.result", "AnalysisResult"),
+    
+    # Processors
+    "Processor": ("heartoo.processing.processor", "Processor"),
+    "ProcessingPipeline": ("heartoo.processing.pipeline", "ProcessingPipeline"),
+    "PipelineBuilder": ("heartoo.processing.builder", "PipelineBuilder"),
+    
+    # HeartPy compatibility functions
+    "process": ("heartoo.compatibility", "process"),
+    "process_segmentwise": ("heartoo.compatibility", "process_segmentwise"),
+    "process_rr": ("heartoo.compatibility", "process_rr"),
+    
+    # Utilities
+    "get_data": ("heartoo.utils.data", "get_data"),
+    "load_exampledata": ("heartoo.utils.data", "load_exampledata"),
+    "plot_signal": ("heartoo.utils.visualization", "plot_signal"),
+    "plot_poincare": ("heartoo.utils.visualization", "plot_poincare"),
+}
+
+_SUBMODULES = {"core", "processing", "compatibility", "utils"}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module, attr = _LAZY[name]
+        value = getattr(importlib.import_module(module), attr)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    # Cache so later lookups skip __getattr__
+    globals()[name] = value
+    return value
 
-# Import processors
-from .processing.processor import Processor
-from .processing.pipeline import ProcessingPipeline
-from .processing.builder import PipelineBuilder
 
-# Import HeartPy compatibility functions
-from .compatibility import process, process_segmentwise, process_rr
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | _SUBMODULES)
 
-# Import utilities
-from .utils.data import get_data, load_exampledata
-from .utils.visualization import plot_signal, plot_poincare
 
 __all__ = [
     # Version
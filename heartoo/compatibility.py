@@ -3,12 +3,43 @@ Compatibility functions for HeartPy API.
 """
 
 from typing import Dict, Any, List, Tuple, Union, Optional
+from functools import lru_cache
+import time
 import numpy as np
 import warnings
 
 from .core.signal import HeartRateSignal
 from .core.result import AnalysisResult
 from .processing.builder import PipelineBuilder
+from .processing.pipeline import ProcessingPipeline, SegmentedPipeline
+
+
+@lru_cache(maxsize=32)
+def _build_pipeline(calc_freq: bool, freq_method: str, welch_wsize: float, freq_square: bool,
+                    hampel_correct: bool, bpmmin: float, bpmmax: float,
+                    breathing_method: str) -> ProcessingPipeline:
+    """Build (once per option set) the pipeline used by process().
+    
+    The processors hold only their configuration, so the same pipeline can
+    be shared between calls instead of rebuilding it every time.
+    
+    Returns
+    -------
+    ProcessingPipeline
+        Pipeline for the given options
+    """
+    builder = PipelineBuilder().with_standard_stages(
+        calc_freq=calc_freq,
+        freq_method=freq_method,
+        welch_wsize=welch_wsize,
+        freq_square=freq_square,
+        hampel_correct=hampel_correct,
+        bpmmin=bpmmin,
+        bpmmax=bpmmax,
+        breathing_method=breathing_method
+    )
+    
+    return builder.build()
 
 
 def process(hrdata: Union[List, np.ndarray], sample_rate: float, windowsize: float = 0.75,
@@ -83,59 +114,31 @@ def process(hrdata: Union[List, np.ndarray], sample_rate: float, windowsize: flo
     # Create signal object
     signal = HeartRateSignal(hrdata, sample_rate)
     
-    # Create pipeline builder
-    builder = PipelineBuilder()
-    
     # Add preprocessing steps
     if interp_clipping:
         # TODO: Implement clipping interpolation
         pass
         
-    if hampel_correct:
-        builder.with_filter('hampel', 10, 'hampel')
-        
-    # Add peak detection
-    builder.with_peak_detector('adaptive', bpmmin, bpmmax)
-    
-    # Add analyzers
-    builder.with_time_domain_analyzer()
-    builder.with_nonlinear_analyzer()
-    
-    if calc_freq:
-        builder.with_frequency_domain_analyzer(
-            method=freq_method,
-            welch_wsize=welch_wsize,
-            square_spectrum=freq_square
-        )
-        
-    builder.with_breathing_analyzer(
-        method=breathing_method,
-        filter_breathing=True,
-        bw_cutoff=[0.1, 0.4]
-    )
-    
-    # Build pipeline
-    pipeline = builder.build()
+    # Get the (cached) pipeline for these options
+    pipeline = _build_pipeline(calc_freq, freq_method, welch_wsize, freq_square,
+                               hampel_correct, bpmmin, bpmmax, breathing_method)
     
     # Create result object if needed
     result = None
     if measures is not None or working_data is not None:
         result = AnalysisResult()
         if measures is not None:
-            for key, value in measures.items():
-                result.set_measure(key, value)
+            result.bulk_update_measures(measures)
         if working_data is not None:
-            for key, value in working_data.items():
-                result.set_working_data(key, value)
+            result.bulk_update_working_data(working_data)
     
     # Process signal
-    import time
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     result = pipeline.process(signal, result)
-    end_time = time.time()
+    elapsed = (time.perf_counter_ns() - start_ns) * 1e-9
     
     if report_time:
-        print(f"\nFinished in {end_time - start_time:.8f} sec")
+        print(f"\nFinished in {elapsed:.8f} sec")
     
     # Return in HeartPy format
     return result.working_data, result.measures
@@ -184,39 +187,24 @@ def process_segmentwise(hrdata: Union[List, np.ndarray], sample_rate: float, seg
     # Create signal object
     signal = HeartRateSignal(hrdata, sample_rate)
     
-    # Create pipeline builder
-    builder = PipelineBuilder()
-    
-    # Configure for segmented processing
-    builder.with_segmenter(
+    # Run the same stages as process() over each segment
+    stages = _build_pipeline(
+        kwargs.get('calc_freq', False),
+        kwargs.get('freq_method', 'welch'),
+        kwargs.get('welch_wsize', 240),
+        kwargs.get('freq_square', False),
+        kwargs.get('hampel_correct', False),
+        kwargs.get('bpmmin', 40),
+        kwargs.get('bpmmax', 180),
+        kwargs.get('breathing_method', 'welch')
+    )
+    pipeline = SegmentedPipeline(
+        processors=stages.processors,
         segment_width=segment_width,
         segment_overlap=segment_overlap,
         segment_min_size=segment_min_size
     )
     
-    # Add standard processing steps
-    if 'calc_freq' in kwargs and kwargs['calc_freq']:
-        builder.with_frequency_domain_analyzer(
-            method=kwargs.get('freq_method', 'welch'),
-            welch_wsize=kwargs.get('welch_wsize', 240),
-            square_spectrum=kwargs.get('freq_square', False)
-        )
-    
-    builder.with_peak_detector(
-        'adaptive',
-        min_bpm=kwargs.get('bpmmin', 40),
-        max_bpm=kwargs.get('bpmmax', 180)
-    )
-    
-    builder.with_time_domain_analyzer()
-    builder.with_nonlinear_analyzer()
-    builder.with_breathing_analyzer(
-        method=kwargs.get('breathing_method', 'welch')
-    )
-    
-    # Build pipeline
-    pipeline = builder.build()
-    
     # Process signal
     result = pipeline.process(signal)
     
@@ -271,19 +259,21 @@ def process_rr(rr_list: List[float], threshold_rr: bool = False, clean_rr: bool
     measures : dict
         Dictionary containing calculated measures
     """
+    # Convert once so the analyzers don't each coerce the list
+    rr_list = np.asarray(rr_list, dtype=np.float64)
+    
     # Create result object
     result = AnalysisResult()
     
     # Set initial RR data
     result.set_working_data('RR_list', rr_list)
-    result.set_working_data('RR_masklist', [0] * len(rr_list))
+    result.set_working_data('RR_masklist', np.zeros(len(rr_list), dtype=np.int64))
     
     # Create pipeline builder
     builder = PipelineBuilder()
     
-    # Add analyzers
-    builder.with_time_domain_analyzer()
-    builder.with_nonlinear_analyzer()
+    # Add analyzers (time-domain and nonlinear measures in one pass)
+    builder.with_rr_statistics_analyzer()
     
     if calc_freq:
         builder.with_frequency_domain_analyzer(
@@ -299,23 +289,16 @@ def process_rr(rr_list: List[float], threshold_rr: bool = False, clean_rr: bool
     # Build pipeline
     pipeline = builder.build()
     
-    # Create a dummy signal
-    dummy_signal = HeartRateSignal(
-        np.zeros(sum(rr_list)),  # Dummy data
-        1000.0  # Sample rate doesn't matter for RR analysis
-    )
-    
-    # Set RR intervals on the signal
-    dummy_signal._rr_intervals = np.array(rr_list)
+    # Create a signal carrying only the RR intervals (its data takes no memory);
+    # sample rate doesn't matter for RR analysis
+    dummy_signal = HeartRateSignal.from_rr(rr_list, 1000.0)
     
     # Process
     if measures is not None:
-        for key, value in measures.items():
-            result.set_measure(key, value)
+        result.bulk_update_measures(measures)
             
     if working_data is not None:
-        for key, value in working_data.items():
-            result.set_working_data(key, value)
+        result.bulk_update_working_data(working_data)
     
     result = pipeline.process(dummy_signal, result)
     
@@ -6,12 +6,89 @@ from typing import Dict, Any, List, Optional, Union, Tuple
 import numpy as np
 from copy import deepcopy
 import json
+import math
+import numbers
+import mmap
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Measure names returned by the get_*_measures methods
+_TIME_SERIES_KEYS = ('bpm', 'ibi', 'sdnn', 'sdsd', 'rmssd', 'pnn20', 'pnn50', 'hr_mad')
+_FREQUENCY_KEYS = ('lf', 'hf', 'lf/hf', 'vlf', 'p_total', 'vlf_perc', 'lf_perc', 'hf_perc', 'lf_nu', 'hf_nu')
+_NONLINEAR_KEYS = ('sd1', 'sd2', 's', 'sd1/sd2')
+_BREATHING_KEYS = ('breathingrate',)
+
+# MessagePack extension type code for numpy arrays
+_NDARRAY_EXT = 1
+
+
+def _as_python_scalar(value: Any) -> Any:
+    """Unwrap NumPy scalars and 0-d arrays; return anything else unchanged."""
+    if isinstance(value, np.generic) or (isinstance(value, np.ndarray) and value.ndim == 0):
+        return value.item()
+    return value
+
+
+def _has_non_finite(value: Any) -> bool:
+    """Check whether value contains NaN or infinity anywhere."""
+    if isinstance(value, (float, np.floating)):
+        return not math.isfinite(value)
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == 'f':
+            return not np.isfinite(value).all()
+        if value.dtype.hasobject:
+            return any(_has_non_finite(v) for v in value.flat)
+        return False
+    if isinstance(value, dict):
+        return any(_has_non_finite(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_has_non_finite(v) for v in value)
+    return False
+
+
+def _msgpack_enc_hook(obj: Any) -> Any:
+    """Encode numpy objects that msgspec doesn't handle natively.
+    
+    Arrays become an extension holding (dtype, shape, raw bytes), so their
+    data is written as one block instead of element by element.
+    """
+    import msgspec
+    
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        arr = np.ascontiguousarray(obj)
+        payload = msgspec.msgpack.encode((arr.dtype.str, arr.shape, arr.data))
+        return msgspec.msgpack.Ext(_NDARRAY_EXT, payload)
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    raise NotImplementedError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+def _msgpack_ext_hook(code: int, data: memoryview) -> Any:
+    """Decode the numpy array extension written by _msgpack_enc_hook."""
+    import msgspec
+    
+    if code != _NDARRAY_EXT:
+        raise NotImplementedError(f"Unknown MessagePack extension type {code}")
+    dtype, shape, buffer = msgspec.msgpack.decode(data)
+    return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
 
 class AnalysisResult:
     """Class to store and manage heart rate analysis results."""
     
+    # Segmentwise processing keeps one result per segment; slots keep them small
+    __slots__ = ('_measures', '_working_data', '_segments')
+    
     def __init__(self):
         """Initialize an empty analysis result."""
         self._measures = {}
@@ -22,6 +99,9 @@ class AnalysisResult:
     def measures(self) -> Dict[str, Any]:
         """Get all analysis measures.
         
+        This is the result's own dictionary, not a copy, so reading from it
+        is cheap; use set_measure() or bulk_update_measures() to change it.
+        
         Returns
         -------
         dict
@@ -33,6 +113,8 @@ class AnalysisResult:
     def working_data(self) -> Dict[str, Any]:
         """Get all working data.
         
+        Like measures, this is the result's own dictionary rather than a copy.
+        
         Returns
         -------
         dict
@@ -63,6 +145,16 @@ class AnalysisResult:
         """
         self._measures[key] = value
         
+    def bulk_update_measures(self, measures: Dict[str, Any]) -> None:
+        """Set several measures at once.
+        
+        Parameters
+        ----------
+        measures : dict
+            Measure names and values to set
+        """
+        self._measures.update(measures)
+        
     def get_measure(self, key: str, default: Any = None) -> Any:
         """Get a specific measure.
         
@@ -92,6 +184,16 @@ class AnalysisResult:
         """
         self._working_data[key] = value
         
+    def bulk_update_working_data(self, working_data: Dict[str, Any]) -> None:
+        """Set several working data entries at once.
+        
+        Parameters
+        ----------
+        working_data : dict
+            Data names and values to set
+        """
+        self._working_data.update(working_data)
+        
     def get_working_data(self, key: str, default: Any = None) -> Any:
         """Get specific working data.
         
@@ -119,6 +221,37 @@ class AnalysisResult:
         """
         self._segments.append(segment)
         
+    def as_segment_soa(self) -> Dict[str, np.ndarray]:
+        """Get segment measures as one array per measure.
+        
+        Each array holds the measure's value for every segment, in segment
+        order, with NaN where a segment lacks the measure or its value is
+        not numeric. Prefer this over walking segments for numerical
+        aggregation, e.g. ``np.nanmean(result.as_segment_soa()['sdnn'])``.
+        
+        The arrays are built on every call, so they always reflect the
+        current segments and can be modified freely.
+        
+        Returns
+        -------
+        dict
+            Measure names mapped to float arrays of length len(segments)
+        """
+        n_segments = len(self._segments)
+        columns = {}
+        for i, segment in enumerate(self._segments):
+            for key, value in segment._measures.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = np.full(n_segments, np.nan)
+                # Strings such as '75' would be parsed by the assignment, so
+                # only real numbers are taken
+                value = _as_python_scalar(value)
+                if isinstance(value, numbers.Real):
+                    column[i] = value
+        
+        return columns
+        
     def get_measures_by_category(self, category: str) -> Dict[str, Any]:
         """Get measures by category prefix.
         
@@ -135,21 +268,37 @@ class AnalysisResult:
         return {k: v for k, v in self._measures.items() 
                 if k.startswith(category)}
                 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, copy: bool = False) -> Dict[str, Any]:
         """Convert result to dictionary.
         
+        The measures and working data dictionaries are shallow copies:
+        arrays and other values are shared with this result, so treat them
+        as read-only or pass ``copy=True``.
+        
+        Parameters
+        ----------
+        copy : bool, default=False
+            Deep copy all values, so the dictionary is fully independent
+            of this result
+        
         Returns
         -------
         dict
             Dictionary containing all measures and working data
         """
-        result = {
-            'measures': deepcopy(self._measures),
-            'working_data': deepcopy(self._working_data)
-        }
+        if copy:
+            result = {
+                'measures': deepcopy(self._measures),
+                'working_data': deepcopy(self._working_data)
+            }
+        else:
+            result = {
+                'measures': dict(self._measures),
+                'working_data': dict(self._working_data)
+            }
         
         if self._segments:
-            result['segments'] = [s.to_dict() for s in self._segments]
+            result['segments'] = [s.to_dict(copy=copy) for s in self._segments]
             
         return result
     
@@ -161,16 +310,8 @@ class AnalysisResult:
         dict
             Time-domain HRV measures
         """
-        return {
-            'bpm': self.get_measure('bpm'),
-            'ibi': self.get_measure('ibi'),
-            'sdnn': self.get_measure('sdnn'),
-            'sdsd': self.get_measure('sdsd'),
-            'rmssd': self.get_measure('rmssd'),
-            'pnn20': self.get_measure('pnn20'),
-            'pnn50': self.get_measure('pnn50'),
-            'hr_mad': self.get_measure('hr_mad')
-        }
+        get = self._measures.get
+        return {key: get(key) for key in _TIME_SERIES_KEYS}
     
     def get_frequency_measures(self) -> Dict[str, Any]:
         """Get frequency-domain HRV measures.
@@ -180,18 +321,8 @@ class AnalysisResult:
         dict
             Frequency-domain HRV measures
         """
-        return {
-            'lf': self.get_measure('lf'),
-            'hf': self.get_measure('hf'),
-            'lf/hf': self.get_measure('lf/hf'),
-            'vlf': self.get_measure('vlf'),
-            'p_total': self.get_measure('p_total'),
-            'vlf_perc': self.get_measure('vlf_perc'),
-            'lf_perc': self.get_measure('lf_perc'),
-            'hf_perc': self.get_measure('hf_perc'),
-            'lf_nu': self.get_measure('lf_nu'),
-            'hf_nu': self.get_measure('hf_nu')
-        }
+        get = self._measures.get
+        return {key: get(key) for key in _FREQUENCY_KEYS}
     
     def get_nonlinear_measures(self) -> Dict[str, Any]:
         """Get nonlinear (Poincaré) HRV measures.
@@ -201,12 +332,8 @@ class AnalysisResult:
         dict
             Nonlinear HRV measures
         """
-        return {
-            'sd1': self.get_measure('sd1'),
-            'sd2': self.get_measure('sd2'),
-            's': self.get_measure('s'),
-            'sd1/sd2': self.get_measure('sd1/sd2')
-        }
+        get = self._measures.get
+        return {key: get(key) for key in _NONLINEAR_KEYS}
     
     def get_breathing_measures(self) -> Dict[str, Any]:
         """Get breathing measures.
@@ -216,9 +343,8 @@ class AnalysisResult:
         dict
             Breathing measures
         """
-        return {
-            'breathingrate': self.get_measure('breathingrate')
-        }
+        get = self._measures.get
+        return {key: get(key) for key in _BREATHING_KEYS}
     
     def merge_from(self, other: 'AnalysisResult') -> None:
         """Merge data from another AnalysisResult.
@@ -229,24 +355,50 @@ class AnalysisResult:
             The result to merge from
         """
         # Merge measures
-        self._measures.update(other.measures)
+        self._measures.update(other._measures)
         
         # Merge working data
-        self._working_data.update(other.working_data)
+        self._working_data.update(other._working_data)
         
         # Append segments (if any)
-        if other.segments:
-            self._segments.extend(other.segments)
+        if other._segments:
+            self._segments += other._segments
     
-    def save_to_json(self, filepath: Union[str, Path]) -> None:
+    def save_to_json(self, filepath: Union[str, Path],
+                     array_threshold: Optional[int] = None) -> None:
         """Save analysis result to JSON file.
         
+        If orjson is installed it encodes numpy arrays directly. It would
+        write NaN and infinity as null, so results containing them are
+        written by the json module instead, which keeps them. Both write the
+        same values, with float32 (and float16) numbers given by the
+        shortest digits that round-trip at their own precision.
+        
         Parameters
         ----------
         filepath : str or Path
             Path to save the JSON file
+        array_threshold : int, optional
+            If given, working data arrays larger than this many bytes are
+            written as binary ``.npy`` files next to the JSON file (named
+            ``<stem>.<key>.npy``) and referenced from it, instead of being
+            written out as JSON lists. load_from_json reads them back.
         """
-        data = self.to_dict()
+        data = self._add_dtype_table(self._to_serializable())
+        if array_threshold is not None:
+            data = self._save_array_sidecars(data, Path(filepath), array_threshold)
+            
+        if orjson is not None:
+            encoded = orjson.dumps(data,
+                                   default=self._convert_numpy_for_json,
+                                   option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2 |
+                                   orjson.OPT_NON_STR_KEYS)
+            # Only look for NaN/infinity when the output has nulls they could have become
+            if b'null' not in encoded or not _has_non_finite(data):
+                with open(filepath, 'wb') as f:
+                    f.write(encoded)
+                return
+            
         # Convert numpy arrays to lists for JSON serialization
         data = self._convert_numpy_for_json(data)
         
@@ -254,13 +406,22 @@ class AnalysisResult:
             json.dump(data, f, indent=2)
     
     @classmethod
-    def load_from_json(cls, filepath: Union[str, Path]) -> 'AnalysisResult':
+    def load_from_json(cls, filepath: Union[str, Path],
+                       mmap_mode: Optional[str] = None) -> 'AnalysisResult':
         """Load analysis result from JSON file.
         
+        Values that were numpy arrays when saved are restored as arrays of
+        their original dtype.
+        
         Parameters
         ----------
         filepath : str or Path
             Path to the JSON file
+        mmap_mode : str, optional
+            Memory-map arrays stored in ``.npy`` files (see the
+            array_threshold argument of save_to_json) with this mode, e.g.
+            'r', instead of reading them into memory. Their data is then
+            only read from disk when it is accessed.
             
         Returns
         -------
@@ -270,6 +431,196 @@ class AnalysisResult:
         with open(filepath, 'r') as f:
             data = json.load(f)
         
+        cls._load_array_sidecars(data, Path(filepath).parent, mmap_mode)
+        cls._restore_arrays(data)
+        return cls._from_serialized(data)
+    
+    @staticmethod
+    def _add_dtype_table(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the dtype of every array value under ``'_dtypes'``.
+        
+        Returns a copy of data; data itself is not modified.
+        """
+        dtypes = {}
+        for section in ('measures', 'working_data'):
+            section_dtypes = {key: value.dtype.str for key, value in data[section].items()
+                              if isinstance(value, np.ndarray) and not value.dtype.hasobject}
+            if section_dtypes:
+                dtypes[section] = section_dtypes
+        
+        data = dict(data)
+        if dtypes:
+            data['_dtypes'] = dtypes
+        if 'segments' in data:
+            data['segments'] = [AnalysisResult._add_dtype_table(segment)
+                                for segment in data['segments']]
+        return data
+    
+    @staticmethod
+    def _restore_arrays(data: Dict[str, Any]) -> None:
+        """Convert values listed in ``'_dtypes'`` back to arrays in place."""
+        for section, section_dtypes in data.pop('_dtypes', {}).items():
+            values = data.get(section, {})
+            for key, dtype in section_dtypes.items():
+                # Arrays loaded from .npy files (possibly memory-mapped) are kept as is
+                if key in values and not isinstance(values[key], np.ndarray):
+                    values[key] = np.asarray(values[key], dtype=dtype)
+        
+        for segment in data.get('segments', []):
+            AnalysisResult._restore_arrays(segment)
+    
+    @staticmethod
+    def _save_array_sidecars(data: Dict[str, Any], filepath: Path, threshold: int,
+                             prefix: str = '') -> Dict[str, Any]:
+        """Write large working data arrays to .npy files next to filepath.
+        
+        Returns a copy of data whose working data references the files
+        as ``{'__npy__': filename}``; data itself is not modified.
+        """
+        working_data = dict(data['working_data'])
+        for key, value in working_data.items():
+            if isinstance(value, np.ndarray) and not value.dtype.hasobject \
+                    and value.nbytes > threshold:
+                filename = f"{filepath.stem}.{prefix}{key}.npy"
+                np.save(filepath.with_name(filename), value)
+                working_data[key] = {'__npy__': filename}
+        
+        data = dict(data, working_data=working_data)
+        if 'segments' in data:
+            data['segments'] = [
+                AnalysisResult._save_array_sidecars(segment, filepath, threshold,
+                                                    f"{prefix}segment{i}.")
+                for i, segment in enumerate(data['segments'])
+            ]
+        return data
+    
+    @staticmethod
+    def _load_array_sidecars(data: Dict[str, Any], directory: Path,
+                             mmap_mode: Optional[str] = None) -> None:
+        """Replace ``{'__npy__': filename}`` working data entries in place."""
+        working_data = data.get('working_data', {})
+        for key, value in working_data.items():
+            if isinstance(value, dict) and '__npy__' in value:
+                working_data[key] = np.load(directory / value['__npy__'], mmap_mode=mmap_mode)
+        
+        for segment in data.get('segments', []):
+            AnalysisResult._load_array_sidecars(segment, directory, mmap_mode)
+    
+    def to_msgpack(self) -> bytes:
+        """Encode analysis result as MessagePack bytes.
+        
+        Numpy arrays are stored as raw bytes with their dtype and shape,
+        which is much faster and smaller than JSON for large working data.
+        Use this to send results between processes, e.g. from workers in
+        a distributed segmented analysis.
+        
+        Returns
+        -------
+        bytes
+            The encoded result
+            
+        Raises
+        ------
+        ImportError
+            If msgspec is not installed
+        """
+        try:
+            import msgspec
+        except ImportError:
+            raise ImportError("msgspec is required to encode results as MessagePack")
+        
+        encoder = msgspec.msgpack.Encoder(enc_hook=_msgpack_enc_hook)
+        return encoder.encode(self._to_serializable())
+    
+    @classmethod
+    def from_msgpack(cls, buffer: bytes) -> 'AnalysisResult':
+        """Decode an analysis result from MessagePack bytes.
+        
+        Arrays are returned as read-only views of the buffer; copy them
+        before modifying.
+        
+        Parameters
+        ----------
+        buffer : bytes-like
+            Bytes produced by to_msgpack
+            
+        Returns
+        -------
+        AnalysisResult
+            Decoded analysis result
+            
+        Raises
+        ------
+        ImportError
+            If msgspec is not installed
+        """
+        try:
+            import msgspec
+        except ImportError:
+            raise ImportError("msgspec is required to decode MessagePack results")
+        
+        decoder = msgspec.msgpack.Decoder(ext_hook=_msgpack_ext_hook)
+        return cls._from_serialized(decoder.decode(buffer))
+    
+    def save_to_msgpack(self, filepath: Union[str, Path]) -> None:
+        """Save analysis result to a MessagePack file.
+        
+        See to_msgpack for the format.
+        
+        Parameters
+        ----------
+        filepath : str or Path
+            Path to save the MessagePack file
+            
+        Raises
+        ------
+        ImportError
+            If msgspec is not installed
+        """
+        encoded = self.to_msgpack()
+        with open(filepath, 'wb') as f:
+            f.write(encoded)
+    
+    @classmethod
+    def load_from_msgpack(cls, filepath: Union[str, Path]) -> 'AnalysisResult':
+        """Load analysis result from a MessagePack file.
+        
+        Arrays are returned as read-only views of the file contents;
+        copy them before modifying.
+        
+        Parameters
+        ----------
+        filepath : str or Path
+            Path to the MessagePack file
+            
+        Returns
+        -------
+        AnalysisResult
+            Loaded analysis result
+            
+        Raises
+        ------
+        ImportError
+            If msgspec is not installed
+        """
+        with open(filepath, 'rb') as f:
+            return cls.from_msgpack(f.read())
+    
+    def _to_serializable(self) -> Dict[str, Any]:
+        """Build the (uncopied) dictionary that is written to disk."""
+        data = {
+            'measures': self._measures,
+            'working_data': self._working_data
+        }
+        
+        if self._segments:
+            data['segments'] = [s._to_serializable() for s in self._segments]
+            
+        return data
+    
+    @classmethod
+    def _from_serialized(cls, data: Dict[str, Any]) -> 'AnalysisResult':
+        """Create a result from a dictionary read from disk."""
         result = cls()
         result._measures = data.get('measures', {})
         result._working_data = data.get('working_data', {})
@@ -308,24 +659,29 @@ class AnalysisResult:
         }
         
         # Compare measures
-        all_keys = set(self._measures.keys()) | set(other._measures.keys())
-        
-        for key in all_keys:
-            if key not in self._measures:
-                comparison['measures_only_in_other'].append(key)
-            elif key not in other._measures:
-                comparison['measures_only_in_self'].append(key)
+        measures1, measures2 = self._measures, other._measures
+        comparison['measures_only_in_self'].extend(measures1.keys() - measures2.keys())
+        comparison['measures_only_in_other'].extend(measures2.keys() - measures1.keys())
+        
+        identical = comparison['identical_measures']
+        different = comparison['different_measures']
+        for key in measures1.keys() & measures2.keys():
+            val1, val2 = measures1[key], measures2[key]
+            # Scalar measures are by far the most common; compare them inline
+            if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+                equal = abs(val1 - val2) <= tolerance
             else:
-                val1, val2 = self._measures[key], other._measures[key]
-                if self._values_equal(val1, val2, tolerance):
-                    comparison['identical_measures'].append(key)
-                else:
-                    comparison['different_measures'].append(key)
-                    comparison['measures_diff'][key] = {
-                        'self': val1,
-                        'other': val2,
-                        'diff': self._calculate_diff(val1, val2)
-                    }
+                equal = self._values_equal(val1, val2, tolerance)
+                
+            if equal:
+                identical.append(key)
+            else:
+                different.append(key)
+                comparison['measures_diff'][key] = {
+                    'self': val1,
+                    'other': val2,
+                    'diff': self._calculate_diff(val1, val2)
+                }
         
         return comparison
     
@@ -333,12 +689,14 @@ class AnalysisResult:
     def compare_json_files(file1: Union[str, Path], file2: Union[str, Path], tolerance: float = 1e-6) -> Dict[str, Any]:
         """Compare two JSON result files.
         
+        Files ending in ``.mpk`` are read as MessagePack (see save_to_msgpack).
+        
         Parameters
         ----------
         file1 : str or Path
-            Path to first JSON file
+            Path to first JSON or MessagePack file
         file2 : str or Path
-            Path to second JSON file
+            Path to second JSON or MessagePack file
         tolerance : float, optional
             Tolerance for numerical comparisons
             
@@ -347,17 +705,60 @@ class AnalysisResult:
         dict
             Comparison results
         """
-        result1 = AnalysisResult.load_from_json(file1)
-        result2 = AnalysisResult.load_from_json(file2)
+        # compare_with only looks at the measures, so skip the working data
+        result1 = AnalysisResult._load_measures(file1)
+        result2 = AnalysisResult._load_measures(file2)
         return result1.compare_with(result2, tolerance)
     
+    @classmethod
+    def _load_measures(cls, filepath: Union[str, Path]) -> 'AnalysisResult':
+        """Load only the measures of a saved result.
+        
+        For MessagePack files the working data and segments are skipped by
+        the decoder without being built, and the file is memory-mapped
+        rather than read. JSON has to be parsed in full, but working data
+        arrays are not converted and .npy files are not read.
+        """
+        result = cls()
+        if Path(filepath).suffix == '.mpk':
+            try:
+                import msgspec
+            except ImportError:
+                raise ImportError("msgspec is required to load MessagePack results")
+            
+            class _Measures(msgspec.Struct):
+                measures: Dict[str, Any] = {}
+            
+            decoder = msgspec.msgpack.Decoder(_Measures, ext_hook=_msgpack_ext_hook)
+            with open(filepath, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                measures = decoder.decode(buffer).measures
+                # Arrays are views of the mapping, which is closed below
+                result._measures = {k: v.copy() if isinstance(v, np.ndarray) else v
+                                    for k, v in measures.items()}
+            return result
+        
+        with open(filepath, 'r') as f:
+            data = json.load(f)
+        
+        data = {'measures': data.get('measures', {}),
+                '_dtypes': {'measures': data.get('_dtypes', {}).get('measures', {})}}
+        cls._restore_arrays(data)
+        result._measures = data['measures']
+        return result
+    
     def _convert_numpy_for_json(self, obj: Any) -> Any:
         """Convert numpy arrays to lists for JSON serialization."""
         if isinstance(obj, np.ndarray):
+            if obj.dtype.kind == 'f' and obj.dtype.itemsize < 8:
+                # Shortest round-trip digits at the array's own precision, as orjson writes them
+                return obj.astype(str).astype(np.float64).tolist()
             return obj.tolist()
         elif isinstance(obj, np.integer):
             return int(obj)
         elif isinstance(obj, np.floating):
+            if obj.dtype.itemsize < 8:
+                return float(str(obj))
             return float(obj)
         elif isinstance(obj, dict):
             return {k: self._convert_numpy_for_json(v) for k, v in obj.items()}
@@ -367,39 +768,64 @@ class AnalysisResult:
     
     def _values_equal(self, val1: Any, val2: Any, tolerance: float) -> bool:
         """Check if two values are equal within tolerance."""
-        try:
-            if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
-                return abs(val1 - val2) <= tolerance
-            elif isinstance(val1, (list, np.ndarray)) and isinstance(val2, (list, np.ndarray)):
-                arr1, arr2 = np.array(val1), np.array(val2)
-                return arr1.shape == arr2.shape and np.allclose(arr1, arr2, atol=tolerance)
-            else:
-                return val1 == val2
-        except:
-            return val1 == val2
+        # NumPy scalars and 0-d arrays compare like the Python values they hold
+        val1, val2 = _as_python_scalar(val1), _as_python_scalar(val2)
+        
+        if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
+            return abs(val1 - val2) <= tolerance
+        
+        if isinstance(val1, (list, np.ndarray)) and isinstance(val2, (list, np.ndarray)):
+            if val1 is val2:
+                return True
+            # asarray avoids copying values that are already arrays
+            try:
+                arr1, arr2 = np.asarray(val1), np.asarray(val2)
+            except (ValueError, TypeError):
+                # Ragged sequences: compare element by element
+                return len(val1) == len(val2) and all(
+                    self._values_equal(item1, item2, tolerance) for item1, item2 in zip(val1, val2))
+            if arr1.shape != arr2.shape:
+                return False
+            if arr1.dtype.kind in 'biuf' and arr2.dtype.kind in 'biuf':
+                return bool(np.allclose(arr1, arr2, atol=tolerance))
+            # Strings, objects etc. have no tolerance
+            return bool(np.array_equal(arr1, arr2))
+        
+        if isinstance(val1, np.ndarray) or isinstance(val2, np.ndarray):
+            # An array never equals a non-sequence value
+            return False
+        
+        return bool(val1 == val2)
     
     def _calculate_diff(self, val1: Any, val2: Any) -> Any:
         """Calculate difference between two values."""
+        val1, val2 = _as_python_scalar(val1), _as_python_scalar(val2)
         try:
             if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
                 return val2 - val1
             elif isinstance(val1, (list, np.ndarray)) and isinstance(val2, (list, np.ndarray)):
-                return (np.array(val2) - np.array(val1)).tolist()
+                return np.subtract(val2, val1).tolist()
             else:
                 return f"'{val1}' vs '{val2}'"
         except:
             return f"'{val1}' vs '{val2}'"
     
     @classmethod
-    def from_heartpy_output(cls, working_data: Dict[str, Any], measures: Dict[str, Any]) -> 'AnalysisResult':
+    def from_heartpy_output(cls, working_data: Dict[str, Any], measures: Dict[str, Any],
+                            copy: bool = False) -> 'AnalysisResult':
         """Create an AnalysisResult from HeartPy output.
         
+        The dictionaries are shallow copied, so arrays in them are shared
+        with the caller unless ``copy=True``.
+        
         Parameters
         ----------
         working_data : dict
             HeartPy working_data dictionary
         measures : dict
             HeartPy measures dictionary
+        copy : bool, default=False
+            Deep copy all values instead of sharing them
             
         Returns
         -------
@@ -407,6 +833,10 @@ class AnalysisResult:
             New AnalysisResult containing the HeartPy data
         """
         result = cls()
-        result._measures = deepcopy(measures)
-        result._working_data = deepcopy(working_data)
+        if copy:
+            result._measures = deepcopy(measures)
+            result._working_data = deepcopy(working_data)
+        else:
+            result._measures = dict(measures)
+            result._working_data = dict(working_data)
         return result
\ No newline at end of file
@@ -4,7 +4,6 @@ Core signal classes for HeartOO.
 
 from typing import Union, Optional, Dict, Any, List, Tuple
 import numpy as np
-from copy import deepcopy
 
 
 class Signal:
@@ -16,7 +15,8 @@ class Signal:
     def __init__(self, 
                  data: Union[List, np.ndarray], 
                  sample_rate: float, 
-                 metadata: Optional[Dict[str, Any]] = None):
+                 metadata: Optional[Dict[str, Any]] = None,
+                 dtype: Optional[np.dtype] = None):
         """Initialize a signal object.
         
         Parameters
@@ -26,10 +26,15 @@ class Signal:
         sample_rate : float
             The sample rate of the signal in Hz
         metadata : dict, optional
-            Additional metadata about the signal
+            Additional metadata about the signal. The dictionary is shallow
+            copied, so its values are shared with the caller.
+        dtype : numpy.dtype, optional
+            Storage dtype for the data, e.g. numpy.float32 to halve memory
+            traffic for ADC-resolution signals. By default the data's own
+            dtype is kept.
         """
         # Ensure data is numpy array
-        self._data = np.asarray(data)
+        self._data = np.asarray(data, dtype=dtype)
         
         # Validate sample rate
         if sample_rate <= 0:
@@ -37,7 +42,29 @@ class Signal:
         self._sample_rate = float(sample_rate)
         
         # Initialize metadata
-        self._metadata = {} if metadata is None else deepcopy(metadata)
+        self._metadata = {} if metadata is None else dict(metadata)
+        
+        self._init_derived()
+    
+    @classmethod
+    def _from_view(cls, data: np.ndarray, sample_rate: float,
+                   metadata: Dict[str, Any]) -> 'Signal':
+        """Create a signal around existing data without conversion or validation.
+        
+        For internal use when data is already an array (typically a view of
+        another signal's data) and sample_rate a validated float.
+        """
+        signal = cls.__new__(cls)
+        signal._data = data
+        signal._sample_rate = sample_rate
+        signal._metadata = dict(metadata)
+        signal._init_derived()
+        return signal
+    
+    def _init_derived(self) -> None:
+        """Reset values that are computed from the data on demand."""
+        # Built on first call to get_time_axis
+        self._time_axis = None
     
     @property
     def data(self) -> np.ndarray:
@@ -50,6 +77,19 @@ class Signal:
         """
         return self._data
     
+    def as_float64(self) -> np.ndarray:
+        """Get the signal data as float64.
+        
+        Returns the data itself when it is already float64, so this only
+        costs a conversion for signals created with a narrower dtype.
+        
+        Returns
+        -------
+        numpy.ndarray
+            The signal data in double precision
+        """
+        return self._data.astype(np.float64, copy=False)
+    
     @property
     def sample_rate(self) -> float:
         """Get the sample rate of the signal.
@@ -122,22 +162,40 @@ class Signal:
         start_idx = int(start_sec * self._sample_rate)
         end_idx = int(end_sec * self._sample_rate)
         
-        # Create new signal with sliced data
-        return self.__class__(
-            data=self._data[start_idx:end_idx], 
-            sample_rate=self._sample_rate,
-            metadata=deepcopy(self._metadata)
-        )
+        # Create new signal around a view of the data
+        return self._from_view(self._data[start_idx:end_idx], self._sample_rate,
+                               self._metadata)
     
     def get_time_axis(self) -> np.ndarray:
         """Get the time axis for the signal.
         
+        The array is computed once and cached, so it is read-only.
+        Use time_at() when only a few sample times are needed.
+        
         Returns
         -------
         numpy.ndarray
             The time axis in seconds
         """
-        return np.arange(len(self._data)) / self._sample_rate
+        if self._time_axis is None:
+            self._time_axis = np.arange(len(self._data)) / self._sample_rate
+            self._time_axis.flags.writeable = False
+        return self._time_axis
+    
+    def time_at(self, index: Union[int, np.ndarray, List[int]]) -> Union[float, np.ndarray]:
+        """Get the time of one or more samples without building the time axis.
+        
+        Parameters
+        ----------
+        index : int or array-like of int
+            Sample index or indices
+            
+        Returns
+        -------
+        float or numpy.ndarray
+            Time in seconds, matching get_time_axis()[index]
+        """
+        return np.asarray(index) / self._sample_rate
     
     def __len__(self) -> int:
         """Get the length of the signal in samples.
@@ -174,7 +232,8 @@ class HeartRateSignal(Signal):
     def __init__(self, 
                  data: Union[List, np.ndarray], 
                  sample_rate: float, 
-                 metadata: Optional[Dict[str, Any]] = None):
+                 metadata: Optional[Dict[str, Any]] = None,
+                 dtype: Optional[np.dtype] = None):
         """Initialize a heart rate signal object.
         
         Parameters
@@ -185,14 +244,54 @@ class HeartRateSignal(Signal):
             The sample rate of the signal in Hz
         metadata : dict, optional
             Additional metadata about the signal
+        dtype : numpy.dtype, optional
+            Storage dtype for the data; by default the data's own dtype is kept
         """
-        super().__init__(data, sample_rate, metadata)
+        super().__init__(data, sample_rate, metadata, dtype)
+    
+    def _init_derived(self) -> None:
+        """Reset values that are computed from the data on demand."""
+        super()._init_derived()
         
         # Heart rate specific properties
         self._peaks = None
         self._rr_intervals = None
+        self._rr_starts = None
+        self._rr_ends = None
         self._rr_indices = None
     
+    @classmethod
+    def from_rr(cls,
+                rr_intervals: Union[List, np.ndarray],
+                sample_rate: float = 1000.0,
+                metadata: Optional[Dict[str, Any]] = None) -> 'HeartRateSignal':
+        """Create a signal that carries only RR intervals.
+        
+        The signal data is a read-only, zero-stride view of a single zero
+        spanning the total RR duration, so no memory is allocated for the
+        (meaningless) samples.
+        
+        Parameters
+        ----------
+        rr_intervals : list or numpy.ndarray
+            RR intervals in milliseconds
+        sample_rate : float
+            Nominal sample rate of the signal in Hz
+        metadata : dict, optional
+            Additional metadata about the signal
+            
+        Returns
+        -------
+        HeartRateSignal
+            Signal with RR intervals set and placeholder data
+        """
+        rr_intervals = np.asarray(rr_intervals, dtype=np.float64)
+        n_samples = int(round(rr_intervals.sum() * sample_rate / 1000.0))
+        
+        signal = cls(np.broadcast_to(0.0, (n_samples,)), sample_rate, metadata)
+        signal._rr_intervals = rr_intervals
+        return signal
+    
     @property
     def peaks(self) -> Optional[np.ndarray]:
         """Get the detected peaks in the signal.
@@ -217,6 +316,8 @@ class HeartRateSignal(Signal):
             self._peaks = np.asarray(value)
             # Reset derived properties
             self._rr_intervals = None
+            self._rr_starts = None
+            self._rr_ends = None
             self._rr_indices = None
     
     @property
@@ -232,32 +333,65 @@ class HeartRateSignal(Signal):
             self._calculate_rr_intervals()
         return self._rr_intervals
     
+    @property
+    def rr_starts(self) -> Optional[np.ndarray]:
+        """Get the start index of each RR interval.
+        
+        Returns
+        -------
+        numpy.ndarray or None
+            View of all peaks but the last if peaks have been detected
+        """
+        if self._rr_starts is None and self._peaks is not None:
+            self._calculate_rr_intervals()
+        return self._rr_starts
+    
+    @property
+    def rr_ends(self) -> Optional[np.ndarray]:
+        """Get the end index of each RR interval.
+        
+        Returns
+        -------
+        numpy.ndarray or None
+            View of all peaks but the first if peaks have been detected
+        """
+        if self._rr_ends is None and self._peaks is not None:
+            self._calculate_rr_intervals()
+        return self._rr_ends
+    
     @property
     def rr_indices(self) -> Optional[List[Tuple[int, int]]]:
         """Get the RR interval indices.
         
+        This is the HeartPy-style list of tuples, which peak detectors store
+        as the 'RR_indices' working data, so it is built for every analyzed
+        signal. Prefer rr_starts and rr_ends for vectorized code.
+        
         Returns
         -------
         list of tuple or None
             The start and end index of each RR interval if peaks have been detected
         """
         if self._rr_indices is None and self._peaks is not None:
-            self._calculate_rr_intervals()
+            starts, ends = self.rr_starts, self.rr_ends
+            self._rr_indices = list(zip(starts.tolist(), ends.tolist()))
         return self._rr_indices
     
     def _calculate_rr_intervals(self) -> None:
         """Calculate RR intervals from the peaks."""
         if self._peaks is None or len(self._peaks) < 2:
             self._rr_intervals = np.array([])
-            self._rr_indices = []
+            self._rr_starts = np.array([], dtype=np.int64)
+            self._rr_ends = np.array([], dtype=np.int64)
             return
             
-        # Calculate intervals in milliseconds
+        # Calculate intervals in milliseconds (same operation order as
+        # HeartPy, so the values match it bit for bit)
         self._rr_intervals = (np.diff(self._peaks) / self.sample_rate) * 1000.0
         
-        # Calculate indices
-        self._rr_indices = [(self._peaks[i], self._peaks[i+1]) 
-                           for i in range(len(self._peaks) - 1)]
+        # Interval boundaries as views of the peaks
+        self._rr_starts = self._peaks[:-1]
+        self._rr_ends = self._peaks[1:]
     
     def get_heart_rate(self) -> float:
         """Calculate heart rate (BPM) from peaks.
@@ -275,8 +409,13 @@ class HeartRateSignal(Signal):
         if self._peaks is None or len(self._peaks) < 2:
             raise ValueError("No peaks detected for heart rate calculation")
         
-        # Calculate heart rate from mean RR interval
-        return 60000 / np.mean(self.rr_intervals)
+        # Calculate heart rate from mean RR interval. The RR intervals are
+        # successive peak differences, so their sum telescopes to the span
+        # between the first and last peak and no intervals need computing.
+        n_intervals = len(self._peaks) - 1
+        span = float(self._peaks[-1] - self._peaks[0])
+        mean_rr = (span / n_intervals / self._sample_rate) * 1000.0
+        return 60000 / mean_rr
     
     def scale_data(self, lower: float = 0, upper: float = 1024) -> 'HeartRateSignal':
         """Scale signal data to a specified range.
@@ -293,8 +432,13 @@ class HeartRateSignal(Signal):
         HeartRateSignal
             A new signal with scaled data
         """
-        rng = np.max(self.data) - np.min(self.data)
         minimum = np.min(self.data)
-        scaled_data = (upper - lower) * ((self.data - minimum) / rng) + lower
+        rng = np.max(self.data) - minimum
+        
+        # Same operations as (upper - lower) * ((data - minimum) / rng) + lower,
+        # but updating a single temporary in place
+        scaled_data = np.true_divide(self.data - minimum, rng)
+        scaled_data *= (upper - lower)
+        scaled_data += lower
         
-        return HeartRateSignal(scaled_data, self.sample_rate, self.metadata)
\ No newline at end of file
+        return HeartRateSignal._from_view(scaled_data, self._sample_rate, self._metadata)
\ No newline at end of file
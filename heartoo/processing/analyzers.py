@@ -3,27 +3,217 @@ Analysis implementations for HeartOO.
 """
 
 from typing import List, Dict, Any, Optional, Union, Tuple
+from functools import lru_cache
 import warnings
 import numpy as np
-from scipy.interpolate import UnivariateSpline, interp1d
-from scipy.signal import welch, periodogram
+from scipy.interpolate import UnivariateSpline, CubicSpline, interp1d
+from scipy import fft as sp_fft
+from scipy.signal import welch, periodogram, get_window
 
 from ..core.signal import HeartRateSignal
 from ..core.result import AnalysisResult
 from .processor import HRVAnalyzer, Processor
+from .filters import _butter_filtfilt
+
+
+@lru_cache(maxsize=32)
+def _welch_window(window: str, nperseg: int) -> np.ndarray:
+    """Get a (read-only) Welch window, built once per length.
+    
+    Parameters
+    ----------
+    window : str
+        Window type, as accepted by scipy.signal.get_window
+    nperseg : int
+        Window length in samples
+        
+    Returns
+    -------
+    numpy.ndarray
+        The window
+    """
+    win = get_window(window, nperseg)
+    win.setflags(write=False)
+    return win
+
+
+def _welch(x: np.ndarray, fs: float, nperseg: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Welch PSD with a Hann window, as used by HeartPy.
+    
+    When the whole signal fits in one segment, the constant detrend is done
+    here (bit-identical to scipy's per-segment detrend) so welch can skip it.
+    
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Evenly sampled signal (not modified)
+    fs : float
+        Sample rate in Hz
+    nperseg : int
+        Segment length in samples
+        
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Frequencies and power spectral density
+    """
+    detrend = 'constant'
+    if nperseg >= len(x):
+        x = x - x.mean()
+        detrend = False
+        
+    # Let scipy.fft spread the per-segment transforms over all cores
+    with sp_fft.set_workers(-1):
+        return welch(x, fs=fs, window=_welch_window('hann', nperseg), nperseg=nperseg,
+                     detrend=detrend)
+
+
+def _rr_interpolator(x: np.ndarray, y: Union[List[float], np.ndarray], interpolation: str):
+    """Build the function used to resample RR intervals.
+    
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Sample positions of the RR intervals
+    y : list or numpy.ndarray of float
+        RR intervals in milliseconds
+    interpolation : str
+        'spline' for a smoothing cubic UnivariateSpline, as HeartPy uses,
+        or 'cubic' for an exact natural CubicSpline, which is cheaper to
+        build but gives (slightly) different spectra than HeartPy
+        
+    Returns
+    -------
+    callable
+        The interpolating function
+    """
+    if interpolation == 'spline':
+        return UnivariateSpline(x, y, k=3)
+    elif interpolation == 'cubic':
+        return CubicSpline(x, y, bc_type='natural')
+    raise ValueError(f"Unknown interpolation: {interpolation}")
+
+
+def _time_domain_stats(rr: np.ndarray, rr_diff: np.ndarray) -> Dict[str, Any]:
+    """Calculate time-domain measures.
+    
+    Parameters
+    ----------
+    rr : numpy.ndarray
+        RR intervals in milliseconds (float64)
+    rr_diff : numpy.ndarray
+        Differences between adjacent RR intervals
+        
+    Returns
+    -------
+    dict
+        Time-domain measures; the successive-difference measures are left
+        out when there are fewer than 2 intervals
+    """
+    measures = {}
+    
+    # Basic measures
+    mean_rr = np.mean(rr)
+    measures['bpm'] = 60000 / mean_rr
+    measures['ibi'] = mean_rr
+    
+    # Variability measures
+    measures['sdnn'] = np.std(rr)
+    
+    if len(rr) < 2:
+        # Need at least 2 points for successive differences
+        return measures
+        
+    rr_absdiff = np.abs(rr_diff)
+    
+    measures['sdsd'] = np.std(rr_absdiff)
+    measures['rmssd'] = np.sqrt(np.mean(rr_diff * rr_diff))
+    
+    # Calculate pNN20 and pNN50
+    measures['pnn20'] = np.count_nonzero(rr_absdiff > 20.0) / len(rr_diff)
+    measures['pnn50'] = np.count_nonzero(rr_absdiff > 50.0) / len(rr_diff)
+    
+    # Calculate mean absolute deviation (one temporary, updated in place)
+    deviation = rr - mean_rr
+    measures['hr_mad'] = np.mean(np.abs(deviation, out=deviation))
+    
+    return measures
+
+
+def _poincare_stats(rr: np.ndarray, rr_diff: np.ndarray) -> Dict[str, Any]:
+    """Calculate nonlinear (Poincaré) measures.
+    
+    Parameters
+    ----------
+    rr : numpy.ndarray
+        RR intervals in milliseconds (float64)
+    rr_diff : numpy.ndarray
+        Differences between adjacent RR intervals
+        
+    Returns
+    -------
+    dict
+        Poincaré measures, NaN when there are fewer than 2 intervals
+    """
+    if len(rr) < 2:
+        return {'sd1': np.nan, 'sd2': np.nan, 's': np.nan, 'sd1/sd2': np.nan}
+        
+    # RR(n) - RR(n+1) is perpendicular to the line of identity,
+    # RR(n) + RR(n+1) runs along it
+    perpendicular = np.negative(rr_diff)
+    perpendicular /= np.sqrt(2)
+    along = rr[:-1] + rr[1:]
+    along /= np.sqrt(2)
+    sd1 = np.sqrt(np.var(perpendicular))
+    sd2 = np.sqrt(np.var(along))
+    
+    return {
+        'sd1': sd1,
+        'sd2': sd2,
+        's': np.pi * sd1 * sd2,  # Area of ellipse
+        'sd1/sd2': sd1 / sd2 if sd2 > 0 else np.nan
+    }
+
+
+def _rr_stats(rr_intervals: Union[List[float], np.ndarray]) -> Dict[str, Any]:
+    """Calculate time-domain and Poincaré measures in one pass over the RR intervals.
+    
+    The successive differences are computed once and shared by both parts.
+    
+    Parameters
+    ----------
+    rr_intervals : list or numpy.ndarray of float
+        RR intervals in milliseconds
+        
+    Returns
+    -------
+    dict
+        Time-domain measures followed by nonlinear (Poincaré) measures
+    """
+    rr = np.asarray(rr_intervals, dtype=np.float64)
+    rr_diff = np.diff(rr)
+    
+    measures = _time_domain_stats(rr, rr_diff)
+    measures.update(_poincare_stats(rr, rr_diff))
+    return measures
+
+
+# Lower edges of the VLF, LF and HF bands and the upper edge of HF (Hz)
+_BAND_EDGES = np.array([0.0033, 0.04, 0.15, 0.4])
+_BAND_EDGES.setflags(write=False)
 
 
 class TimeDomainAnalyzer(HRVAnalyzer):
     """Time-domain HRV analyzer."""
     
-    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: List[float]) -> Dict[str, Any]:
+    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: np.ndarray) -> Dict[str, Any]:
         """Calculate time-domain HRV measures.
         
         Parameters
         ----------
         signal : HeartRateSignal
             Signal to analyze
-        rr_intervals : list of float
+        rr_intervals : numpy.ndarray
             RR intervals in milliseconds
             
         Returns
@@ -31,48 +221,40 @@ class TimeDomainAnalyzer(HRVAnalyzer):
         dict
             Time-domain HRV measures
         """
-        measures = {}
-        
-        # Basic measures
-        measures['bpm'] = 60000 / np.mean(rr_intervals)
-        measures['ibi'] = np.mean(rr_intervals)
-        
-        # Variability measures
-        measures['sdnn'] = np.std(rr_intervals)
+        rr = np.asarray(rr_intervals, dtype=np.float64)
+        return _time_domain_stats(rr, np.diff(rr))
+
+
+class RRStatisticsAnalyzer(HRVAnalyzer):
+    """Combined time-domain and nonlinear (Poincaré) HRV analyzer.
+    
+    Produces the measures of TimeDomainAnalyzer and NonlinearAnalyzer
+    together from a single pass over the RR intervals.
+    """
+    
+    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: np.ndarray) -> Dict[str, Any]:
+        """Calculate time-domain and nonlinear HRV measures.
         
-        # Calculate RMSSD and related measures
-        if len(rr_intervals) > 1:
-            # Differences between adjacent RR intervals
-            rr_diff = np.abs(np.diff(rr_intervals))
-            rr_sqdiff = np.power(rr_diff, 2)
-            
-            measures['sdsd'] = np.std(rr_diff)
-            measures['rmssd'] = np.sqrt(np.mean(rr_sqdiff))
-            
-            # Calculate pNN20 and pNN50
-            nn20 = rr_diff[np.where(rr_diff > 20.0)]
-            nn50 = rr_diff[np.where(rr_diff > 50.0)]
-            
-            try:
-                measures['pnn20'] = float(len(nn20)) / float(len(rr_diff))
-            except:
-                measures['pnn20'] = np.nan
-                
-            try:
-                measures['pnn50'] = float(len(nn50)) / float(len(rr_diff))
-            except:
-                measures['pnn50'] = np.nan
-                
-            # Calculate mean absolute deviation
-            measures['hr_mad'] = np.mean(np.abs(rr_intervals - np.mean(rr_intervals)))
+        Parameters
+        ----------
+        signal : HeartRateSignal
+            Signal to analyze
+        rr_intervals : numpy.ndarray
+            RR intervals in milliseconds
             
-        return measures
+        Returns
+        -------
+        dict
+            Time-domain and nonlinear HRV measures
+        """
+        return _rr_stats(rr_intervals)
 
 
 class FrequencyDomainAnalyzer(HRVAnalyzer):
     """Frequency-domain HRV analyzer."""
     
-    def __init__(self, method: str = 'welch', welch_wsize: float = 240.0, square_spectrum: bool = False):
+    def __init__(self, method: str = 'welch', welch_wsize: float = 240.0, square_spectrum: bool = False,
+                 interpolation: str = 'spline'):
         """Initialize frequency-domain analyzer.
         
         Parameters
@@ -83,19 +265,22 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
             Window size in seconds for Welch's method
         square_spectrum : bool
             Whether to square the spectrum
+        interpolation : str
+            RR interval interpolation ('spline' as in HeartPy, or 'cubic')
         """
         self.method = method
         self.welch_wsize = welch_wsize
         self.square_spectrum = square_spectrum
+        self.interpolation = interpolation
         
-    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: List[float]) -> Dict[str, Any]:
+    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: np.ndarray) -> Dict[str, Any]:
         """Calculate frequency-domain HRV measures.
         
         Parameters
         ----------
         signal : HeartRateSignal
             Signal to analyze
-        rr_intervals : list of float
+        rr_intervals : numpy.ndarray
             RR intervals in milliseconds
             
         Returns
@@ -103,6 +288,7 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
         dict
             Frequency-domain HRV measures
         """
+        rr_intervals = np.asarray(rr_intervals, dtype=np.float64)
         measures = {}
         working_data = {}
         
@@ -122,13 +308,15 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
                 'hf_nu': np.nan
             }
             
+        # Aggregate RR-list (its last element is the total duration)
+        rr_x = rr_intervals.cumsum()
+        
         # Check if signal is short (less than 5 minutes)
-        if np.sum(rr_intervals) < 300000:
+        if rr_x[-1] < 300000:
             warnings.warn('Short signal for frequency analysis. Results may not be reliable.', 
                           UserWarning)
         
-        # Aggregate RR-list and interpolate to a uniform sampling rate at 4x resolution
-        rr_x = np.cumsum(rr_intervals)
+        # Interpolate to a uniform sampling rate at 4x resolution
         
         resamp_factor = 4
         datalen = int((len(rr_x) - 1) * resamp_factor)
@@ -136,21 +324,22 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
         
         if len(rr_x) > 3:  # Need at least 4 points for cubic spline
             # Interpolate RR intervals to uniform sampling
-            interpolation_func = UnivariateSpline(rr_x, rr_intervals, k=3)
+            interpolation_func = _rr_interpolator(rr_x, rr_intervals, self.interpolation)
             rr_interp = interpolation_func(rr_x_new)
             
             # Calculate sampling rate
-            dt = np.mean(rr_intervals) / 1000  # in sec
+            dt = rr_intervals.mean() / 1000  # in sec
             fs = 1 / dt  # about 1.1 Hz
             fs_new = fs * resamp_factor
             
             # Compute PSD
             if self.method == 'fft':
-                frq = np.fft.fftfreq(datalen, d=(1 / fs_new))
-                frq = frq[range(int(datalen / 2))]
-                Y = np.fft.fft(rr_interp) / datalen
-                Y = Y[range(int(datalen / 2))]
-                psd = np.power(np.abs(Y), 2)
+                # The input is real, so only the non-negative half of the
+                # spectrum is computed (and the Nyquist bin dropped, as before)
+                nbins = int(datalen / 2)
+                frq = sp_fft.rfftfreq(datalen, d=(1 / fs_new))[:nbins]
+                Y = sp_fft.rfft(rr_interp)[:nbins] / datalen
+                psd = Y.real ** 2 + Y.imag ** 2
                 
             elif self.method == 'periodogram':
                 frq, psd = periodogram(rr_interp, fs=fs_new)
@@ -158,7 +347,7 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
             elif self.method == 'welch':
                 # Calculate window size
                 nperseg = min(int(self.welch_wsize * fs_new), len(rr_x_new))
-                frq, psd = welch(rr_interp, fs=fs_new, nperseg=nperseg)
+                frq, psd = _welch(rr_interp, fs_new, nperseg)
                 
             else:
                 raise ValueError(f"Unknown method: {self.method}")
@@ -174,15 +363,14 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
             # Calculate power in different bands
             df = frq[1] - frq[0]  # frequency resolution
             
-            # Standard frequency bands
-            vlf_band = (frq >= 0.0033) & (frq < 0.04)
-            lf_band = (frq >= 0.04) & (frq < 0.15)
-            hf_band = (frq >= 0.15) & (frq < 0.4)
+            # Standard frequency bands; frq is sorted, so each band
+            # (lower <= f < upper) is a contiguous slice
+            vlf_lo, lf_lo, hf_lo, hf_hi = np.searchsorted(frq, _BAND_EDGES)
             
             # Calculate absolute power in each band using trapezoidal integration
-            measures['vlf'] = np.trapz(psd[vlf_band], dx=df)
-            measures['lf'] = np.trapz(psd[lf_band], dx=df)
-            measures['hf'] = np.trapz(psd[hf_band], dx=df)
+            measures['vlf'] = np.trapz(psd[vlf_lo:lf_lo], dx=df)
+            measures['lf'] = np.trapz(psd[lf_lo:hf_lo], dx=df)
+            measures['hf'] = np.trapz(psd[hf_lo:hf_hi], dx=df)
             
             # Calculate total power and LF/HF ratio
             measures['p_total'] = measures['vlf'] + measures['lf'] + measures['hf']
@@ -233,14 +421,14 @@ class FrequencyDomainAnalyzer(HRVAnalyzer):
 class NonlinearAnalyzer(HRVAnalyzer):
     """Nonlinear (Poincaré) HRV analyzer."""
     
-    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: List[float]) -> Dict[str, Any]:
+    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: np.ndarray) -> Dict[str, Any]:
         """Calculate nonlinear HRV measures.
         
         Parameters
         ----------
         signal : HeartRateSignal
             Signal to analyze
-        rr_intervals : list of float
+        rr_intervals : numpy.ndarray
             RR intervals in milliseconds
             
         Returns
@@ -248,41 +436,16 @@ class NonlinearAnalyzer(HRVAnalyzer):
         dict
             Nonlinear HRV measures
         """
-        measures = {}
-        
-        if len(rr_intervals) < 2:
-            # Need at least 2 points for Poincaré analysis
-            return {
-                'sd1': np.nan,
-                'sd2': np.nan,
-                's': np.nan,
-                'sd1/sd2': np.nan
-            }
-            
-        # Generate vectors of adjacent RR intervals
-        x_plus = rr_intervals[:-1]  # RR(n)
-        x_minus = rr_intervals[1:]  # RR(n+1)
-        
-        # Calculate Poincaré measures
-        x_one = (np.array(x_plus) - np.array(x_minus)) / np.sqrt(2)  # Perpendicular to line of identity
-        x_two = (np.array(x_plus) + np.array(x_minus)) / np.sqrt(2)  # Along line of identity
-        
-        sd1 = np.sqrt(np.var(x_one))  # SD perpendicular to identity line
-        sd2 = np.sqrt(np.var(x_two))  # SD along identity line
-        s = np.pi * sd1 * sd2  # Area of ellipse
-        
-        measures['sd1'] = sd1
-        measures['sd2'] = sd2
-        measures['s'] = s
-        measures['sd1/sd2'] = sd1 / sd2 if sd2 > 0 else np.nan
-        
-        return measures
+        rr = np.asarray(rr_intervals, dtype=np.float64)
+        return _poincare_stats(rr, np.diff(rr))
 
 
 class BreathingAnalyzer(Processor):
     """Breathing rate analyzer."""
     
-    def __init__(self, method: str = 'welch', filter_breathing: bool = True, bw_cutoff: List[float] = [0.1, 0.4]):
+    def __init__(self, method: str = 'welch', filter_breathing: bool = True, bw_cutoff: List[float] = [0.1, 0.4],
+                 interpolation: str = 'spline', resample_rate: float = 1000.0,
+                 dtype: Optional[np.dtype] = None, sos: bool = False):
         """Initialize breathing analyzer.
         
         Parameters
@@ -293,10 +456,28 @@ class BreathingAnalyzer(Processor):
             Whether to filter the breathing signal
         bw_cutoff : list of float
             Cutoff frequencies for breathing filter [low, high]
+        interpolation : str
+            RR interval interpolation ('spline' as in HeartPy, or 'cubic')
+        resample_rate : float
+            Rate (Hz) the RR intervals are resampled to. HeartPy uses 1000 Hz;
+            breathing lies below 1 Hz, so e.g. 10 Hz gives nearly the same
+            estimate on 100x fewer samples
+        dtype : numpy.dtype, optional
+            Precision of the spectral estimate, e.g. numpy.float32 to halve
+            the memory traffic of the FFT. By default float64 is kept, as in
+            HeartPy
+        sos : bool
+            Filter the breathing signal with second-order sections
+            (sosfiltfilt), as ButterworthFilter(sos=True) does. Off by
+            default to match HeartPy
         """
         self.method = method
         self.filter_breathing = filter_breathing
         self.bw_cutoff = bw_cutoff
+        self.interpolation = interpolation
+        self.resample_rate = resample_rate
+        self.dtype = dtype
+        self.sos = sos
         
     def process(self, signal: HeartRateSignal, result: Optional[AnalysisResult] = None) -> AnalysisResult:
         """Calculate breathing rate and update result.
@@ -323,38 +504,42 @@ class BreathingAnalyzer(Processor):
             result.set_measure('breathingrate', np.nan)
             return result
             
+        rr_intervals = np.asarray(rr_intervals, dtype=np.float64)
+        fs = float(self.resample_rate)
+        
         try:
-            # Resample RR intervals to 1000Hz
+            # Resample RR intervals (in ms) to the resample rate
             x = np.linspace(0, len(rr_intervals), len(rr_intervals))
-            x_new = np.linspace(0, len(rr_intervals), int(np.sum(rr_intervals)))
-            interp = UnivariateSpline(x, rr_intervals, k=3)
+            x_new = np.linspace(0, len(rr_intervals), int(rr_intervals.sum() * (fs / 1000.0)))
+            interp = _rr_interpolator(x, rr_intervals, self.interpolation)
             breathing = interp(x_new)
             
             # Filter breathing signal if requested
             if self.filter_breathing:
-                # Implement bandpass filter
-                from scipy.signal import butter, filtfilt
-                nyq = 500.0  # Nyquist frequency (1000Hz / 2)
-                low = self.bw_cutoff[0] / nyq
-                high = self.bw_cutoff[1] / nyq
-                b, a = butter(2, [low, high], btype='band')
-                breathing = filtfilt(b, a, breathing)
+                # Second-order bandpass, with the padding shortened for short recordings
+                breathing = _butter_filtfilt(breathing, fs, self.bw_cutoff, 2, 'band', sos=self.sos)
+                
+            # filtfilt works in float64 anyway, so narrow only for the spectrum
+            if self.dtype is not None:
+                breathing = breathing.astype(self.dtype, copy=False)
                 
             # Calculate frequency spectrum
             if self.method == 'fft':
                 datalen = len(breathing)
-                frq = np.fft.fftfreq(datalen, d=0.001)  # 1000Hz
-                frq = frq[range(int(datalen / 2))]
-                Y = np.fft.fft(breathing) / datalen
-                Y = Y[range(int(datalen / 2))]
-                psd = np.power(np.abs(Y), 2)
+                nbins = int(datalen / 2)
+                frq = sp_fft.rfftfreq(datalen, d=(1 / fs))[:nbins]
+                # Divide in place so a float32 spectrum is not promoted
+                Y = sp_fft.rfft(breathing)[:nbins]
+                Y /= datalen
+                psd = Y.real ** 2 + Y.imag ** 2
                 
             elif self.method == 'welch':
-                nperseg = min(30000, len(breathing) // 10) if len(breathing) > 30000 else len(breathing)
-                frq, psd = welch(breathing, fs=1000, nperseg=nperseg)
+                max_seg = int(30 * fs)  # 30 seconds
+                nperseg = min(max_seg, len(breathing) // 10) if len(breathing) > max_seg else len(breathing)
+                frq, psd = _welch(breathing, fs, nperseg)
                 
             elif self.method == 'periodogram':
-                frq, psd = periodogram(breathing, fs=1000.0)
+                frq, psd = periodogram(breathing, fs=fs)
                 
             else:
                 raise ValueError(f"Unknown method: {self.method}")
@@ -364,9 +549,11 @@ class BreathingAnalyzer(Processor):
             
             # Store result
             result.set_measure('breathingrate', breathingrate)
-            result.set_working_data('breathing_signal', breathing)
-            result.set_working_data('breathing_psd', psd)
-            result.set_working_data('breathing_frq', frq)
+            result.bulk_update_working_data({
+                'breathing_signal': breathing,
+                'breathing_psd': psd,
+                'breathing_frq': frq
+            })
             
         except Exception as e:
             # If anything goes wrong, set breathing rate to NaN
@@ -2,9 +2,12 @@
 Pipeline builder for HeartOO.
 """
 
+import os
 from typing import Optional, Dict, Any, List, Union, Type
 from copy import deepcopy
 
+import numpy as np
+
 from ..core.signal import HeartRateSignal
 from ..core.result import AnalysisResult
 from .processor import Processor, FilterProcessor, PeakDetector, HRVAnalyzer
@@ -13,6 +16,7 @@ from .filters import ButterworthFilter, HampelFilter, BaselineWanderRemovalFilte
 from .peak_detectors import AdaptiveThresholdPeakDetector
 from .analyzers import (
     TimeDomainAnalyzer, 
+    RRStatisticsAnalyzer,
     FrequencyDomainAnalyzer, 
     NonlinearAnalyzer,
     BreathingAnalyzer
@@ -33,6 +37,7 @@ class PipelineBuilder:
         self._segment_overlap = 0.0
         self._segment_min_size = 20.0
         self._segmented = False
+        self._n_workers = 1
         
     def with_filter(self, 
                     filter_type: str,
@@ -62,7 +67,7 @@ class PipelineBuilder:
         if filter_type.lower() == 'butterworth':
             self._processors.append(ButterworthFilter(cutoff, filtertype))
         elif filter_type.lower() == 'hampel':
-            self._processors.append(HampelFilter(cutoff, filtertype))
+            self._processors.append(HampelFilter(cutoff, filtertype=filtertype))
         elif filter_type.lower() == 'baseline_wander':
             self._processors.append(BaselineWanderRemovalFilter())
         else:
@@ -113,6 +118,20 @@ class PipelineBuilder:
         self._processors.append(TimeDomainAnalyzer())
         return self
         
+    def with_rr_statistics_analyzer(self) -> 'PipelineBuilder':
+        """Add a combined time-domain and nonlinear analyzer to the pipeline.
+        
+        Equivalent to with_time_domain_analyzer() followed by
+        with_nonlinear_analyzer(), but computed in a single pass.
+        
+        Returns
+        -------
+        PipelineBuilder
+            Self for method chaining
+        """
+        self._processors.append(RRStatisticsAnalyzer())
+        return self
+        
     def with_frequency_domain_analyzer(self, 
                                       method: str = 'welch',
                                       welch_wsize: float = 240.0,
@@ -154,7 +173,10 @@ class PipelineBuilder:
     def with_breathing_analyzer(self, 
                               method: str = 'welch',
                               filter_breathing: bool = True,
-                              bw_cutoff: List[float] = [0.1, 0.4]) -> 'PipelineBuilder':
+                              bw_cutoff: List[float] = [0.1, 0.4],
+                              resample_rate: float = 1000.0,
+                              dtype: Optional[np.dtype] = None,
+                              sos: bool = False) -> 'PipelineBuilder':
         """Add a breathing analyzer to the pipeline.
         
         Parameters
@@ -165,6 +187,12 @@ class PipelineBuilder:
             Whether to filter the breathing signal
         bw_cutoff : list of float
             Cutoff frequencies for breathing filter [low, high]
+        resample_rate : float
+            Rate (Hz) the RR intervals are resampled to before estimation
+        dtype : numpy.dtype, optional
+            Precision of the spectral estimate (float64 by default)
+        sos : bool
+            Filter the breathing signal with second-order sections
             
         Returns
         -------
@@ -174,10 +202,72 @@ class PipelineBuilder:
         self._processors.append(BreathingAnalyzer(
             method=method,
             filter_breathing=filter_breathing,
-            bw_cutoff=bw_cutoff
+            bw_cutoff=bw_cutoff,
+            resample_rate=resample_rate,
+            dtype=dtype,
+            sos=sos
         ))
         return self
         
+    def with_standard_stages(self, *,
+                             calc_freq: bool = False,
+                             freq_method: str = 'welch',
+                             welch_wsize: float = 240.0,
+                             freq_square: bool = False,
+                             hampel_correct: bool = False,
+                             bpmmin: float = 40,
+                             bpmmax: float = 180,
+                             breathing_method: str = 'welch') -> 'PipelineBuilder':
+        """Add the stages run by the HeartPy-compatible process() function.
+        
+        Adds optional Hampel filtering, adaptive peak detection, time-domain
+        and nonlinear analysis, optional frequency-domain analysis and
+        breathing analysis, in that order.
+        
+        Parameters
+        ----------
+        calc_freq : bool
+            Whether to include frequency domain analysis
+        freq_method : str
+            Method for spectral estimation ('welch', 'fft', 'periodogram')
+        welch_wsize : float
+            Window size in seconds for Welch's method
+        freq_square : bool
+            Whether to square the spectrum
+        hampel_correct : bool
+            Whether to apply a Hampel filter before peak detection
+        bpmmin : float
+            Minimum BPM to consider
+        bpmmax : float
+            Maximum BPM to consider
+        breathing_method : str
+            Method for breathing rate estimation
+            
+        Returns
+        -------
+        PipelineBuilder
+            Self for method chaining
+        """
+        if hampel_correct:
+            self.with_filter('hampel', 10, 'hampel')
+            
+        self.with_peak_detector('adaptive', bpmmin, bpmmax)
+        self.with_rr_statistics_analyzer()
+        
+        if calc_freq:
+            self.with_frequency_domain_analyzer(
+                method=freq_method,
+                welch_wsize=welch_wsize,
+                square_spectrum=freq_square
+            )
+            
+        self.with_breathing_analyzer(
+            method=breathing_method,
+            filter_breathing=True,
+            bw_cutoff=[0.1, 0.4]
+        )
+        return self
+        
     def with_segmenter(self, 
                       segment_width: float = 120.0,
                       segment_overlap: float = 0.0,
@@ -204,6 +294,22 @@ class PipelineBuilder:
         self._segment_min_size = segment_min_size
         return self
         
+    def with_parallelism(self, n_workers: Optional[int] = None) -> 'PipelineBuilder':
+        """Process segments of a segmented pipeline on several threads.
+        
+        Parameters
+        ----------
+        n_workers : int, optional
+            Number of worker threads. Defaults to the number of CPUs
+            
+        Returns
+        -------
+        PipelineBuilder
+            Self for method chaining
+        """
+        self._n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
+        return self
+        
     def with_custom_processor(self, processor: Processor) -> 'PipelineBuilder':
         """Add a custom processor to the pipeline.
         
@@ -233,7 +339,8 @@ class PipelineBuilder:
                 processors=self._processors.copy(),
                 segment_width=self._segment_width,
                 segment_overlap=self._segment_overlap,
-                segment_min_size=self._segment_min_size
+                segment_min_size=self._segment_min_size,
+                n_workers=self._n_workers
             )
         else:
             return ProcessingPipeline(self._processors.copy())
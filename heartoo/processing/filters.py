@@ -2,18 +2,342 @@
 Filter implementations for HeartOO.
 """
 
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Tuple
+from functools import lru_cache
 import numpy as np
-from scipy.signal import butter, filtfilt
+from scipy.signal import butter, filtfilt, sosfiltfilt
 
 from ..core.signal import HeartRateSignal
 from .processor import FilterProcessor
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+@lru_cache(maxsize=64)
+def _design_butter(order: int, wn: Union[float, Tuple[float, ...]], btype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Design (once per parameter set) Butterworth filter coefficients.
+    
+    Parameters
+    ----------
+    order : int
+        Filter order
+    wn : float or tuple of float
+        Cutoff frequency or frequencies, normalized to Nyquist
+    btype : str
+        Filter type ('lowpass', 'highpass', 'bandpass', 'bandstop')
+        
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Numerator (b) and denominator (a) coefficients, read-only
+    """
+    b, a = butter(order, wn, btype=btype)
+    b.setflags(write=False)
+    a.setflags(write=False)
+    return b, a
+
+
+@lru_cache(maxsize=64)
+def _design_butter_sos(order: int, wn: Union[float, Tuple[float, ...]], btype: str) -> np.ndarray:
+    """Design (once per parameter set) Butterworth second-order sections.
+    
+    Parameters
+    ----------
+    order : int
+        Filter order
+    wn : float or tuple of float
+        Cutoff frequency or frequencies, normalized to Nyquist
+    btype : str
+        Filter type ('lowpass', 'highpass', 'bandpass', 'bandstop')
+        
+    Returns
+    -------
+    numpy.ndarray
+        Second-order sections. Shared between calls, so must not be modified
+        (it is left writeable because scipy's sosfilt rejects read-only arrays)
+    """
+    return butter(order, wn, btype=btype, output='sos')
+
+
+def _butter_filtfilt(data: np.ndarray, sample_rate: float, cutoff: Union[float, List[float], Tuple[float, ...]],
+                     order: int, btype: str, sos: bool = False) -> np.ndarray:
+    """Zero-phase Butterworth filtering with cached coefficients.
+    
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Signal data
+    sample_rate : float
+        Sample rate in Hz
+    cutoff : float or sequence of float
+        Cutoff frequency or frequencies in Hz
+    order : int
+        Filter order
+    btype : str
+        Filter type ('lowpass', 'highpass', 'bandpass', 'bandstop')
+    sos : bool
+        Filter with second-order sections instead of the (b, a) form HeartPy uses
+        
+    Returns
+    -------
+    numpy.ndarray
+        Filtered data
+    """
+    nyq = 0.5 * sample_rate
+    
+    # Normalize cutoff (as a tuple of floats so it can key the coefficient cache)
+    if np.ndim(cutoff) > 0:
+        cutoff_norm = tuple(float(cf / nyq) for cf in np.ravel(cutoff))
+    else:
+        cutoff_norm = float(cutoff / nyq)
+        
+    # scipy pads by 3 * ntaps and refuses signals that are not longer than
+    # that; short segments get the longest padding that fits instead
+    n = np.shape(data)[-1]
+    
+    if sos:
+        sections = _design_butter_sos(order, cutoff_norm, btype)
+        ntaps = 2 * len(sections) + 1 - min((sections[:, 2] == 0).sum(), (sections[:, 5] == 0).sum())
+        return sosfiltfilt(sections, data, padlen=min(3 * ntaps, n - 1))
+        
+    b, a = _design_butter(order, cutoff_norm, btype)
+    return filtfilt(b, a, data, padlen=min(3 * max(len(a), len(b)), n - 1))
+
+
+def _sorted_insert(buf: np.ndarray, size: int, value: float) -> None:
+    """Insert value into the sorted buf[:size], shifting larger values up."""
+    j = size
+    while j > 0 and buf[j - 1] > value:
+        buf[j] = buf[j - 1]
+        j -= 1
+    buf[j] = value
+
+
+def _sorted_remove(buf: np.ndarray, size: int, value: float) -> None:
+    """Remove one occurrence of value from the sorted buf[:size]."""
+    j = 0
+    while buf[j] != value:
+        j += 1
+    while j < size - 1:
+        buf[j] = buf[j + 1]
+        j += 1
+
+
+def _sorted_median(buf: np.ndarray, size: int) -> float:
+    """Median of the sorted buf[:size], computed like np.median."""
+    mid = size // 2
+    if size % 2:
+        return buf[mid]
+    return (buf[mid - 1] + buf[mid]) / 2
+
+
+def _sorted_mad(buf: np.ndarray, size: int, median: float) -> float:
+    """Median absolute deviation from median of the sorted buf[:size].
+    
+    The deviations left of the median grow leftwards and those right of it
+    grow rightwards, so they are merged outwards from the median until
+    the middle one(s) are reached, without sorting.
+    """
+    right = 0
+    while right < size and buf[right] < median:
+        right += 1
+    left = right - 1
+    
+    mid = size // 2
+    lower = 0.0
+    dev = 0.0
+    for _ in range(mid + 1):
+        lower = dev
+        if right >= size or (left >= 0 and abs(buf[left] - median) <= abs(buf[right] - median)):
+            dev = abs(buf[left] - median)
+            left -= 1
+        else:
+            dev = abs(buf[right] - median)
+            right += 1
+            
+    if size % 2:
+        return dev
+    return (lower + dev) / 2
+
+
+def _hampel(data: np.ndarray, half_window: int, threshold: float) -> np.ndarray:
+    """Replace outliers in data (in place) with their window median.
+    
+    Windows are taken from the partially corrected data, so a replaced
+    sample is seen as its median by the windows that follow it.
+    
+    The window is kept as a sorted buffer that is updated as it slides
+    (and when a sample is replaced), so the median and MAD are read off
+    in O(window) time without sorting or allocating per sample. A window
+    containing NaN has a NaN median, so no sample is replaced, as with
+    np.median.
+    
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Signal data, modified in place
+    half_window : int
+        Number of samples on each side of the window centre
+    threshold : float
+        Threshold for outlier detection (in MADs)
+        
+    Returns
+    -------
+    numpy.ndarray
+        The corrected data
+    """
+    n = len(data)
+    buf = np.empty(min(n, 2 * half_window + 1))
+    size = 0
+    n_nan = 0
+    
+    # Window of the first sample
+    for j in range(min(n, half_window + 1)):
+        if np.isnan(data[j]):
+            n_nan += 1
+        else:
+            _sorted_insert(buf, size, data[j])
+            size += 1
+    
+    for i in range(n):
+        if n_nan == 0:
+            # Calculate median and MAD
+            median = _sorted_median(buf, size)
+            mad = _sorted_mad(buf, size, median)
+            
+            # Avoid division by zero
+            if mad == 0:
+                start = max(0, i - half_window)
+                end = min(n, i + half_window + 1)
+                mad = np.mean(np.abs(data[start:end] - median))
+                if mad == 0:
+                    mad = 1e-10
+                    
+            # Check if point is an outlier
+            if np.abs(data[i] - median) > threshold * mad:
+                # Replace with median, also in the window
+                _sorted_remove(buf, size, data[i])
+                data[i] = median
+                _sorted_insert(buf, size - 1, data[i])
+        
+        # Slide the window: drop its first sample, add the next one
+        if i - half_window >= 0:
+            if np.isnan(data[i - half_window]):
+                n_nan -= 1
+            else:
+                _sorted_remove(buf, size, data[i - half_window])
+                size -= 1
+        if i + half_window + 1 < n:
+            if np.isnan(data[i + half_window + 1]):
+                n_nan += 1
+            else:
+                _sorted_insert(buf, size, data[i + half_window + 1])
+                size += 1
+            
+    return data
+
+
+# Compile the per-sample loops when Numba is available; it is the same code either way
+if njit is not None:
+    _sorted_insert = njit(cache=True)(_sorted_insert)
+    _sorted_remove = njit(cache=True)(_sorted_remove)
+    _sorted_median = njit(cache=True)(_sorted_median)
+    _sorted_mad = njit(cache=True)(_sorted_mad)
+    _hampel = njit(cache=True)(_hampel)
+
+
+def _window_outliers(windows: np.ndarray, centre: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Find outliers among window centres.
+    
+    Parameters
+    ----------
+    windows : numpy.ndarray
+        2D array with one window per row
+    centre : numpy.ndarray
+        The value each window is centred on
+    threshold : float
+        Threshold for outlier detection (in MADs)
+        
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Boolean outlier mask and the window medians
+    """
+    # np.median already selects with np.partition (introselect), so no
+    # hand-rolled selection is needed here
+    median = np.median(windows, axis=1)
+    deviation = windows - median[:, None]
+    np.abs(deviation, out=deviation)
+    mad = np.median(deviation, axis=1)
+    
+    # Avoid division by zero, as in _hampel
+    zero = mad == 0
+    if zero.any():
+        mad[zero] = np.mean(deviation[zero], axis=1)
+        mad[mad == 0] = 1e-10
+        
+    return np.abs(centre - median) > threshold * mad, median
+
+
+def _hampel_windowed(data: np.ndarray, half_window: int, threshold: float,
+                     chunk_size: int = 65536) -> np.ndarray:
+    """Replace outliers with their window median, using the original data.
+    
+    Unlike _hampel, every window is taken from the uncorrected data, so all
+    full-size windows can be handled at once as a sliding window view.
+    Windows are truncated at the edges just like in _hampel.
+    
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Signal data (not modified)
+    half_window : int
+        Number of samples on each side of the window centre
+    threshold : float
+        Threshold for outlier detection (in MADs)
+    chunk_size : int
+        Number of windows processed per batch, bounding the size of the
+        temporaries to chunk_size * window length
+        
+    Returns
+    -------
+    numpy.ndarray
+        The corrected data
+    """
+    data = np.asarray(data, dtype=np.float64)
+    out = data.copy()
+    n = len(data)
+    width = 2 * half_window + 1
+    
+    # Full windows: centre i has window data[i - half_window:i + half_window + 1]
+    if n >= width:
+        windows = np.lib.stride_tricks.sliding_window_view(data, width)
+        for start in range(0, len(windows), chunk_size):
+            batch = windows[start:start + chunk_size]
+            centres = slice(start + half_window, start + half_window + len(batch))
+            outliers, median = _window_outliers(batch, data[centres], threshold)
+            out[centres][outliers] = median[outliers]
+    
+    # Truncated windows at both edges
+    edges = range(n) if n < width else \
+        list(range(half_window)) + list(range(n - half_window, n))
+    for i in edges:
+        window = data[max(0, i - half_window):min(n, i + half_window + 1)]
+        outliers, median = _window_outliers(window[None, :], data[i:i + 1], threshold)
+        if outliers[0]:
+            out[i] = median[0]
+            
+    return out
+
 
 class ButterworthFilter(FilterProcessor):
     """Butterworth filter implementation."""
     
-    def __init__(self, cutoff: Union[float, List[float]], filtertype: str = 'lowpass', order: int = 4):
+    def __init__(self, cutoff: Union[float, List[float]], filtertype: str = 'lowpass', order: int = 4,
+                 sos: bool = False):
         """Initialize Butterworth filter.
         
         Parameters
@@ -24,9 +348,13 @@ class ButterworthFilter(FilterProcessor):
             Filter type ('lowpass', 'highpass', 'bandpass', 'bandstop')
         order : int
             Filter order
+        sos : bool
+            Use second-order sections (sosfiltfilt), which stay stable for
+            high orders and very low cutoffs. Off by default to match HeartPy
         """
         super().__init__(cutoff, filtertype)
         self.order = order
+        self.sos = sos
         
     def apply_filter(self, signal: HeartRateSignal) -> HeartRateSignal:
         """Apply Butterworth filter to signal.
@@ -41,19 +369,8 @@ class ButterworthFilter(FilterProcessor):
         HeartRateSignal
             Filtered signal
         """
-        nyq = 0.5 * signal.sample_rate
-        
-        # Normalize cutoff
-        if isinstance(self.cutoff, list):
-            cutoff_norm = [cf / nyq for cf in self.cutoff]
-        else:
-            cutoff_norm = self.cutoff / nyq
-            
-        # Create filter coefficients
-        b, a = butter(self.order, cutoff_norm, btype=self.filtertype)
-        
-        # Apply filter
-        filtered_data = filtfilt(b, a, signal.data)
+        filtered_data = _butter_filtfilt(signal.data, signal.sample_rate, self.cutoff,
+                                         self.order, self.filtertype, sos=self.sos)
         
         return HeartRateSignal(filtered_data, signal.sample_rate, signal.metadata)
 
@@ -61,7 +378,8 @@ class ButterworthFilter(FilterProcessor):
 class HampelFilter(FilterProcessor):
     """Hampel filter implementation."""
     
-    def __init__(self, window_size: int = 10, threshold: float = 3.0, filtertype: str = 'hampel'):
+    def __init__(self, window_size: int = 10, threshold: float = 3.0, filtertype: str = 'hampel',
+                 recursive: bool = True):
         """Initialize Hampel filter.
         
         Parameters
@@ -72,9 +390,15 @@ class HampelFilter(FilterProcessor):
             Threshold for outlier detection (in MADs)
         filtertype : str
             Always 'hampel' for compatibility with FilterProcessor interface
+        recursive : bool
+            If True (the default), windows include samples that were already
+            corrected, which requires a sequential loop. If False, windows
+            are taken from the original data and all samples are filtered at
+            once with vectorized medians, which is much faster without Numba.
         """
         super().__init__(window_size, filtertype)
         self.threshold = threshold
+        self.recursive = recursive
         
     def apply_filter(self, signal: HeartRateSignal) -> HeartRateSignal:
         """Apply Hampel filter to signal.
@@ -89,31 +413,12 @@ class HampelFilter(FilterProcessor):
         HeartRateSignal
             Filtered signal
         """
-        data = signal.data.copy()
-        window_size = int(self.cutoff)
-        half_window = window_size // 2
-        n = len(data)
-        
-        for i in range(n):
-            # Define window boundaries
-            start = max(0, i - half_window)
-            end = min(n, i + half_window + 1)
-            
-            # Extract window
-            window = data[start:end]
-            
-            # Calculate median and MAD
-            median = np.median(window)
-            mad = np.median(np.abs(window - median))
-            
-            # Avoid division by zero
-            if mad == 0:
-                mad = np.mean(np.abs(window - median)) or 1e-10
-                
-            # Check if point is an outlier
-            if np.abs(data[i] - median) > self.threshold * mad:
-                # Replace with median
-                data[i] = median
+        half_window = int(self.cutoff) // 2
+        
+        if self.recursive:
+            data = _hampel(signal.data.copy(), half_window, float(self.threshold))
+        else:
+            data = _hampel_windowed(signal.data, half_window, float(self.threshold))
                 
         return HeartRateSignal(data, signal.sample_rate, signal.metadata)
 
@@ -144,6 +449,8 @@ class BaselineWanderRemovalFilter(FilterProcessor):
         HeartRateSignal
             Filtered signal
         """
-        # Use Butterworth high-pass filter
-        butterworth = ButterworthFilter(self.cutoff, 'highpass')
-        return butterworth.apply_filter(signal)
\ No newline at end of file
+        # Butterworth high-pass filter (same defaults as ButterworthFilter)
+        filtered_data = _butter_filtfilt(signal.data, signal.sample_rate, self.cutoff,
+                                         4, 'highpass')
+        
+        return HeartRateSignal(filtered_data, signal.sample_rate, signal.metadata)
\ No newline at end of file
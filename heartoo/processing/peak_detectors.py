@@ -5,11 +5,70 @@ Peak detection implementations for HeartOO.
 from typing import List, Optional, Dict, Any, Tuple
 import numpy as np
 from copy import deepcopy
+from scipy.ndimage import uniform_filter1d
 
 from ..core.signal import HeartRateSignal
 from ..core.result import AnalysisResult
 from .processor import PeakDetector
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _run_peaks(data: np.ndarray, threshold: np.ndarray) -> np.ndarray:
+    """Find the first maximum of every segment of samples above the threshold.
+    
+    Segments are split exactly like the vectorized path in
+    _detect_with_threshold (and HeartPy): each split falls on the last sample
+    of a run, so that sample opens the next segment.
+    
+    Parameters
+    ----------
+    data : numpy.ndarray
+        Signal data
+    threshold : numpy.ndarray
+        Threshold for each sample
+        
+    Returns
+    -------
+    numpy.ndarray
+        Peak positions (int64)
+    """
+    # Positions above the threshold
+    candidates = np.empty(len(data), dtype=np.int64)
+    n = 0
+    for i in range(len(data)):
+        if data[i] > threshold[i]:
+            candidates[n] = i
+            n += 1
+            
+    peaks = np.empty(n, dtype=np.int64)
+    n_peaks = 0
+    start = 0
+    for k in range(n + 1):
+        # Segment boundary at every gap, and at the end
+        if k < n - 1 and candidates[k + 1] - candidates[k] <= 1:
+            continue
+        stop = k if k < n - 1 else n
+        if stop > start:
+            best = candidates[start]
+            for j in range(start + 1, stop):
+                if data[candidates[j]] > data[best]:
+                    best = candidates[j]
+            peaks[n_peaks] = best
+            n_peaks += 1
+        start = stop
+        if stop == n:
+            break
+            
+    return peaks[:n_peaks]
+
+
+# A single scan beats the vectorized version only when compiled
+_run_peaks_jit = njit(cache=True)(_run_peaks) if njit is not None else None
+
 
 class AdaptiveThresholdPeakDetector(PeakDetector):
     """Peak detector using adaptive thresholding."""
@@ -70,20 +129,12 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
         # Calculate window size in samples
         window = int(windowsize * sample_rate)
         
-        # Pad data for rolling mean calculation
-        half_window = window // 2
-        padded_data = np.pad(data, half_window, mode='edge')
-        
-        # Initialize rolling mean array
-        rolling_mean = np.zeros(len(data))
-        
-        # Calculate rolling mean
-        for i in range(len(data)):
-            rolling_mean[i] = np.mean(padded_data[i:i+window])
-            
-        return rolling_mean
+        # Centred moving average with edge values repeated at both ends, as a
+        # single O(N) running-sum pass
+        return uniform_filter1d(np.asarray(data, dtype=np.float64), size=window, mode='nearest')
     
-    def _detect_with_threshold(self, data: np.ndarray, rol_mean: np.ndarray, ma_perc: float) -> List[int]:
+    def _detect_with_threshold(self, data: np.ndarray, rol_mean: np.ndarray, ma_perc: float,
+                               mean_perc: Optional[float] = None) -> List[int]:
         """Detect peaks using a specific threshold.
         
         Parameters
@@ -94,16 +145,24 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
             Rolling mean of signal
         ma_perc : float
             Percentage to raise rolling mean
+        mean_perc : float, optional
+            One percent of the mean rolling mean, if already known
             
         Returns
         -------
         list of int
             Detected peak positions
         """
+        if mean_perc is None:
+            mean_perc = np.mean(rol_mean / 100)
+            
         # Calculate threshold
-        mn = np.mean(rol_mean / 100) * ma_perc
+        mn = mean_perc * ma_perc
         threshold = rol_mean + mn
         
+        if _run_peaks_jit is not None:
+            return _run_peaks_jit(data, threshold).tolist()
+            
         # Find positions where signal is above threshold
         peaksx = np.where((data > threshold))[0]
         peaksy = data[peaksx]
@@ -113,17 +172,22 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
                                     np.where(np.diff(peaksx) > 1)[0],
                                     np.array([len(peaksx)])))
         
-        # Find peaks in each segment
-        peaklist = []
-        for i in range(len(peakedges) - 1):
-            segment = peaksx[peakedges[i]:peakedges[i+1]]
-            segment_values = peaksy[peakedges[i]:peakedges[i+1]]
+        # Drop empty segments; the rest start at strictly increasing offsets
+        starts = peakedges[:-1][np.diff(peakedges) > 0]
+        if len(starts) == 0:
+            return []
             
-            if len(segment) > 0:
-                max_idx = np.argmax(segment_values)
-                peaklist.append(segment[max_idx])
-                
-        return peaklist
+        # Maximum of each segment, then the first position reaching it (like argmax)
+        segment_max = np.maximum.reduceat(peaksy, starts)
+        segment_ids = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(peaksx))))
+        at_max = np.flatnonzero(peaksy == segment_max[segment_ids])
+        
+        # at_max is sorted, so each segment's first maximum is where the
+        # segment id changes (no sort needed, unlike np.unique)
+        max_ids = segment_ids[at_max]
+        first = np.flatnonzero(np.concatenate(([True], max_ids[1:] != max_ids[:-1])))
+        
+        return peaksx[at_max[first]].tolist()
     
     def _fit_peaks(self, data: np.ndarray, rol_mean: np.ndarray, sample_rate: float) -> Tuple[float, List[int]]:
         """Find optimal threshold for peak detection.
@@ -145,24 +209,65 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
         # List of thresholds to try
         ma_perc_list = [5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100]
         
+        # Detect peaks once per threshold; the retry below only rescores them
+        mean_perc = np.mean(rol_mean / 100)
+        candidates = [(ma_perc, self._detect_with_threshold(data, rol_mean, ma_perc, mean_perc))
+                      for ma_perc in ma_perc_list]
+        
+        best_ma, best_peaks = self._best_threshold(candidates, len(data), sample_rate,
+                                                   self.min_bpm, self.max_bpm)
+        
+        # If no valid thresholds found, try again with wider BPM range
+        if best_ma is None:
+            # Use local bounds rather than widening self.min_bpm/max_bpm so a
+            # detector shared between pipelines is never left in a modified state
+            best_ma, best_peaks = self._best_threshold(candidates, len(data), sample_rate, 30, 200)
+            
+        # If still no valid threshold found (or no peaks), use the HeartPy default
+        if best_ma is None or not best_peaks:
+            best_ma = 20
+            best_peaks = dict(candidates)[best_ma]
+            
+        return best_ma, best_peaks
+    
+    def _best_threshold(self, candidates: List[Tuple[float, List[int]]], data_len: int, sample_rate: float,
+                        min_bpm: float, max_bpm: float) -> Tuple[Optional[float], List[int]]:
+        """Pick the threshold whose peaks have the most regular RR intervals.
+        
+        Parameters
+        ----------
+        candidates : list of tuple
+            (threshold percentage, detected peaks) pairs, in the order tried
+        data_len : int
+            Number of samples in the signal
+        sample_rate : float
+            Sample rate in Hz
+        min_bpm : float
+            Minimum acceptable heart rate
+        max_bpm : float
+            Maximum acceptable heart rate
+            
+        Returns
+        -------
+        tuple
+            (best threshold percentage, detected peaks), or (None, []) if no
+            threshold gives a heart rate within the bounds
+        """
         best_rrsd = float('inf')
         best_ma = None
         best_peaks = []
         
-        for ma_perc in ma_perc_list:
-            # Detect peaks with current threshold
-            peaks = self._detect_with_threshold(data, rol_mean, ma_perc)
-            
+        for ma_perc, peaks in candidates:
             # Skip if no peaks detected
             if len(peaks) < 2:
                 continue
                 
             # Calculate RR intervals and BPM
             rr_intervals = (np.diff(peaks) / sample_rate) * 1000.0
-            bpm = (len(peaks) / (len(data) / sample_rate)) * 60
+            bpm = (len(peaks) / (data_len / sample_rate)) * 60
             
             # Check if BPM is within acceptable range
-            if self.min_bpm <= bpm <= self.max_bpm:
+            if min_bpm <= bpm <= max_bpm:
                 # Calculate RR interval standard deviation
                 rrsd = np.std(rr_intervals)
                 
@@ -171,54 +276,7 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
                     best_rrsd = rrsd
                     best_ma = ma_perc
                     best_peaks = peaks
-        
-        # If no valid thresholds found, try again with wider BPM range
-        if best_ma is None:
-            min_bpm_orig = self.min_bpm
-            max_bpm_orig = self.max_bpm
-            
-            try:
-                self.min_bpm = 30
-                self.max_bpm = 200
-                # Try again with the same process but don't recurse further
-                for ma_perc in ma_perc_list:
-                    # Detect peaks with current threshold
-                    peaks = self._detect_with_threshold(data, rol_mean, ma_perc)
-                    
-                    # Skip if no peaks detected
-                    if len(peaks) < 2:
-                        continue
-                        
-                    # Calculate RR intervals and BPM
-                    rr_intervals = (np.diff(peaks) / sample_rate) * 1000.0
-                    bpm = (len(peaks) / (len(data) / sample_rate)) * 60
                     
-                    # Check if BPM is within acceptable range
-                    if self.min_bpm <= bpm <= self.max_bpm:
-                        # Calculate RR interval standard deviation
-                        rrsd = np.std(rr_intervals)
-                        
-                        # Update best if this is better
-                        if rrsd < best_rrsd:
-                            best_rrsd = rrsd
-                            best_ma = ma_perc
-                            best_peaks = peaks
-                
-                # If still no valid threshold found, use default
-                if best_ma is None:
-                    best_ma = 20  # Default value from HeartPy
-                    best_peaks = self._detect_with_threshold(data, rol_mean, best_ma)
-                    
-            finally:
-                # Restore original BPM range
-                self.min_bpm = min_bpm_orig
-                self.max_bpm = max_bpm_orig
-                
-        # Final check if we found any peaks
-        if not best_peaks:
-            best_ma = 20  # Default value from HeartPy
-            best_peaks = self._detect_with_threshold(data, rol_mean, best_ma)
-            
         return best_ma, best_peaks
     
     def process(self, signal: HeartRateSignal, result: Optional[AnalysisResult] = None) -> AnalysisResult:
@@ -258,20 +316,21 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
                 
             # Identify peaks to exclude based on RR interval
             rem_idx = np.where((rr_list <= lower_threshold) | (rr_list >= upper_threshold))[0] + 1
+            rem_idx = rem_idx[rem_idx < len(peaks)]
             
-            removed_beats = [peaks[i] for i in rem_idx if i < len(peaks)]
-            removed_beats_y = [ybeat[i] for i in rem_idx if i < len(ybeat)]
+            removed_beats = np.asarray(peaks)[rem_idx].tolist()
+            removed_beats_y = np.asarray(ybeat)[rem_idx].tolist()
             
             # Create binary mask for peaks
             binary_peaklist = np.ones(len(peaks))
-            for i in rem_idx:
-                if i < len(binary_peaklist):
-                    binary_peaklist[i] = 0
+            binary_peaklist[rem_idx] = 0
                     
             # Update result
-            result.set_working_data('removed_beats', removed_beats)
-            result.set_working_data('removed_beats_y', removed_beats_y)
-            result.set_working_data('binary_peaklist', binary_peaklist.tolist())
+            result.bulk_update_working_data({
+                'removed_beats': removed_beats,
+                'removed_beats_y': removed_beats_y,
+                'binary_peaklist': binary_peaklist.tolist()
+            })
             
             # Calculate corrected RR intervals
             self._update_rr_intervals(result)
@@ -292,26 +351,26 @@ class AdaptiveThresholdPeakDetector(PeakDetector):
         if len(rr_list) == 0 or len(binary_peaklist) == 0:
             return
             
-        # Get RR intervals between valid peaks
-        rr_list_cor = [rr_list[i] for i in range(len(rr_list)) 
-                       if i < len(binary_peaklist)-1 and 
-                       binary_peaklist[i] + binary_peaklist[i+1] == 2]
+        rr_list = np.asarray(rr_list, dtype=np.float64)
+        binary_peaklist = np.asarray(binary_peaklist)
         
-        # Create mask for rejected intervals
-        rr_mask = [0 if (i < len(binary_peaklist)-1 and 
-                          binary_peaklist[i] + binary_peaklist[i+1] == 2) 
-                  else 1 for i in range(len(rr_list))]
+        # An interval is valid when the peaks on both ends were accepted
+        n_pairs = min(len(rr_list), len(binary_peaklist) - 1)
+        valid = np.zeros(len(rr_list), dtype=bool)
+        valid[:n_pairs] = (binary_peaklist[:n_pairs] + binary_peaklist[1:n_pairs + 1]) == 2
         
-        # Calculate differences between adjacent RR intervals
-        rr_diff = []
-        for i in range(len(rr_list_cor) - 1):
-            rr_diff.append(abs(rr_list_cor[i] - rr_list_cor[i + 1]))
-            
-        # Square differences
-        rr_sqdiff = [x**2 for x in rr_diff]
+        # Get RR intervals between valid peaks, and the mask of rejected intervals
+        rr_list_cor = rr_list[valid]
+        rr_mask = (~valid).astype(np.int64)
+        
+        # Calculate (squared) differences between adjacent RR intervals
+        rr_diff = np.abs(np.diff(rr_list_cor))
+        rr_sqdiff = rr_diff ** 2
         
         # Update result
-        result.set_working_data('RR_masklist', rr_mask)
-        result.set_working_data('RR_list_cor', rr_list_cor)
-        result.set_working_data('RR_diff', rr_diff)
-        result.set_working_data('RR_sqdiff', rr_sqdiff)
\ No newline at end of file
+        result.bulk_update_working_data({
+            'RR_masklist': rr_mask,
+            'RR_list_cor': rr_list_cor,
+            'RR_diff': rr_diff,
+            'RR_sqdiff': rr_sqdiff
+        })
\ No newline at end of file
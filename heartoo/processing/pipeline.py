@@ -2,8 +2,8 @@
 Processing pipeline for HeartOO.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any, Union
-from copy import deepcopy
 
 from ..core.signal import HeartRateSignal
 from ..core.result import AnalysisResult
@@ -143,7 +143,8 @@ class SegmentedPipeline(ProcessingPipeline):
                  processors: Optional[List[Processor]] = None,
                  segment_width: float = 120.0,
                  segment_overlap: float = 0.0,
-                 segment_min_size: float = 20.0):
+                 segment_min_size: float = 20.0,
+                 n_workers: int = 1):
         """Initialize a segmented processing pipeline.
         
         Parameters
@@ -156,15 +157,22 @@ class SegmentedPipeline(ProcessingPipeline):
             Overlap between segments as fraction (0 to 1)
         segment_min_size : float
             Minimum size of segment to process in seconds
+        n_workers : int
+            Number of threads segments are processed on. The heavy lifting
+            (filtering, FFTs, welch) happens in NumPy/SciPy routines that
+            release the GIL, so threads scale without pickling any data
         """
         super().__init__(processors)
         
         if not 0 <= segment_overlap < 1:
             raise ValueError("Segment overlap must be between 0 and 1")
+        if n_workers < 1:
+            raise ValueError("Number of workers must be at least 1")
             
         self.segment_width = segment_width
         self.segment_overlap = segment_overlap
         self.segment_min_size = segment_min_size
+        self.n_workers = n_workers
         
     def make_windows(self, signal: HeartRateSignal) -> List[tuple]:
         """Create windows for segmented processing.
@@ -222,22 +230,17 @@ class SegmentedPipeline(ProcessingPipeline):
         # Create segments
         windows = self.make_windows(signal)
         
-        # Process each segment
-        for start, end in windows:
-            # Create segment signal
-            segment_signal = HeartRateSignal(
-                signal.data[start:end],
-                signal.sample_rate,
-                deepcopy(signal.metadata)
-            )
+        # Process each segment (segments are independent, and the processors
+        # keep no per-call state, so they can run concurrently)
+        if self.n_workers > 1 and len(windows) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.n_workers, len(windows))) as executor:
+                segment_results = list(executor.map(
+                    lambda window: self._process_segment(signal, window), windows))
+        else:
+            segment_results = [self._process_segment(signal, window) for window in windows]
             
-            # Process segment
-            segment_result = super().process(segment_signal)
-            
-            # Add segment indices
-            segment_result.set_working_data('segment_indices', (start, end))
-            
-            # Add to main result
+        # Add to main result, in segment order
+        for segment_result in segment_results:
             result.add_segment(segment_result)
             
         # Aggregate segment results
@@ -245,6 +248,38 @@ class SegmentedPipeline(ProcessingPipeline):
             
         return result
     
+    def _process_segment(self, signal: HeartRateSignal, window: tuple) -> AnalysisResult:
+        """Process a single segment of a signal.
+        
+        Parameters
+        ----------
+        signal : HeartRateSignal
+            Full signal
+        window : tuple
+            Start and end index of the segment
+            
+        Returns
+        -------
+        AnalysisResult
+            Result for the segment
+        """
+        start, end = window
+        
+        # Create segment signal around a view of the data
+        segment_signal = HeartRateSignal._from_view(
+            signal.data[start:end],
+            signal.sample_rate,
+            signal.metadata
+        )
+        
+        # Process segment
+        segment_result = super().process(segment_signal)
+        
+        # Add segment indices
+        segment_result.set_working_data('segment_indices', (start, end))
+        
+        return segment_result
+    
     def _aggregate_segment_results(self, result: AnalysisResult) -> None:
         """Aggregate segment results into main result.
         
@@ -5,6 +5,8 @@ Processor interface and base implementations for HeartOO.
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, List, Union
 
+import numpy as np
+
 from ..core.signal import HeartRateSignal
 from ..core.result import AnalysisResult
 
@@ -153,13 +155,17 @@ class PeakDetector(Processor):
         signal.peaks = peaks
         
         # Update result
-        result.set_working_data('peaklist', peaks)
-        result.set_working_data('ybeat', [signal.data[p] for p in peaks])
+        result.bulk_update_working_data({
+            'peaklist': peaks,
+            'ybeat': [signal.data[p] for p in peaks]
+        })
         
         # Calculate RR intervals
         if signal.rr_intervals is not None:
-            result.set_working_data('RR_list', signal.rr_intervals)
-            result.set_working_data('RR_indices', signal.rr_indices)
+            result.bulk_update_working_data({
+                'RR_list': signal.rr_intervals,
+                'RR_indices': signal.rr_indices
+            })
         
         return result
 
@@ -168,15 +174,15 @@ class HRVAnalyzer(Processor):
     """Base class for HRV analysis processors."""
     
     @abstractmethod
-    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: List[float]) -> Dict[str, Any]:
+    def calculate_measures(self, signal: HeartRateSignal, rr_intervals: np.ndarray) -> Dict[str, Any]:
         """Calculate HRV measures.
         
         Parameters
         ----------
         signal : HeartRateSignal
             Signal to analyze
-        rr_intervals : list of float
-            RR intervals in milliseconds
+        rr_intervals : numpy.ndarray
+            RR intervals in milliseconds, as a float64 array
             
         Returns
         -------
@@ -209,11 +215,14 @@ class HRVAnalyzer(Processor):
         if rr_intervals is None or len(rr_intervals) < 2:
             return result
             
+        # Convert once here (a no-op for float64 arrays) so analyzers never
+        # walk a Python list
+        rr_intervals = np.asarray(rr_intervals, dtype=np.float64)
+        
         # Calculate measures
         measures = self.calculate_measures(signal, rr_intervals)
         
         # Update result
-        for key, value in measures.items():
-            result.set_measure(key, value)
+        result.bulk_update_measures(measures)
             
         return result
\ No newline at end of file
@@ -2,21 +2,20 @@
 Visualization utilities for HeartOO.
 """
 
-from typing import Optional, List, Dict, Any, Union, Tuple
+from typing import Optional, List, Dict, Any, Union, Tuple, TYPE_CHECKING
 import numpy as np
 import warnings
 
-try:
-    import matplotlib.pyplot as plt
-    import matplotlib as mpl
-except ImportError:
-    warnings.warn("Matplotlib not found. Visualization functions will not work.")
+# Matplotlib is imported inside each plotting function, so importing this
+# module (and heartoo) stays cheap until something is actually plotted
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
 def plot_signal(signal: np.ndarray, sample_rate: float, title: str = "Heart Rate Signal",
                 figsize: Tuple[int, int] = (12, 4), peaks: Optional[List[int]] = None,
                 rejected_peaks: Optional[List[int]] = None,
-                show: bool = True) -> Optional[plt.Figure]:
+                show: bool = True) -> Optional['Figure']:
     """Plot a heart rate signal with detected peaks.
     
     Parameters
@@ -42,6 +41,8 @@ def plot_signal(signal: np.ndarray, sample_rate: float, title: str = "Heart Rate
         Figure object if show=False, None otherwise
     """
     try:
+        import matplotlib.pyplot as plt
+        
         # Create figure
         fig = plt.figure(figsize=figsize)
         ax = fig.add_subplot(111)
@@ -81,7 +82,7 @@ def plot_signal(signal: np.ndarray, sample_rate: float, title: str = "Heart Rate
 
 def plot_poincare(rr_intervals: np.ndarray, sd1: Optional[float] = None, sd2: Optional[float] = None,
                  title: str = "Poincaré Plot", figsize: Tuple[int, int] = (6, 6),
-                 show: bool = True) -> Optional[plt.Figure]:
+                 show: bool = True) -> Optional['Figure']:
     """Create a Poincaré plot from RR intervals.
     
     Parameters
@@ -110,6 +111,8 @@ def plot_poincare(rr_intervals: np.ndarray, sd1: Optional[float] = None, sd2: Op
             warnings.warn("Not enough RR intervals for Poincaré plot")
             return None
         
+        import matplotlib.pyplot as plt
+        
         # Create figure
         fig = plt.figure(figsize=figsize)
         ax = fig.add_subplot(111, aspect='equal')
@@ -163,7 +166,7 @@ def plot_poincare(rr_intervals: np.ndarray, sd1: Optional[float] = None, sd2: Op
 def plot_breathing(breathing_signal: np.ndarray, breathing_rate: float, 
                   sample_rate: float = 1000.0, title: str = "Breathing Signal",
                   figsize: Tuple[int, int] = (12, 4),
-                  show: bool = True) -> Optional[plt.Figure]:
+                  show: bool = True) -> Optional['Figure']:
     """Plot breathing signal and rate.
     
     Parameters
@@ -187,6 +190,8 @@ def plot_breathing(breathing_signal: np.ndarray, breathing_rate: float,
         Figure object if show=False, None otherwise
     """
     try:
+        import matplotlib.pyplot as plt
+        
         # Create figure
         fig = plt.figure(figsize=figsize)
         ax = fig.add_subplot(111)
@@ -233,13 +233,14 @@ class ResultComparator:
     """Compare HeartPy and HeartSW results."""
 
     @staticmethod
-    def calculate_percentage_difference(val1: float, val2: float) -> float:
-        """Calculate percentage difference between two values."""
-        if val1 == 0 and val2 == 0:
-            return 0.0
-        if val1 == 0:
-            return 100.0
-        return abs(val1 - val2) / abs(val1) * 100.0
+    def calculate_percentage_difference(val1: np.ndarray, val2: np.ndarray) -> np.ndarray:
+        """Calculate percentage difference between two values (or arrays of values), relative to val1."""
+        val1 = np.asarray(val1, dtype=np.float64)
+        val2 = np.asarray(val2, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(val1 == 0,
+                            np.where(val2 == 0, 0.0, 100.0),
+                            np.abs(val1 - val2) / np.abs(val1) * 100.0)
 
     @staticmethod
     def compare_measures(heartpy_measures: Dict, heartsw_measures: Dict) -> Dict[str, Any]:
@@ -248,22 +249,29 @@ class ResultComparator:
 
         # Key measures to compare
         key_measures = ['bpm', 'ibi', 'sdnn', 'sdsd', 'rmssd', 'pnn20', 'pnn50']
+        common = [m for m in key_measures if m in heartpy_measures and m in heartsw_measures]
 
-        for measure in key_measures:
-            if measure in heartpy_measures and measure in heartsw_measures:
-                hp_val = heartpy_measures[measure]
-                hsw_val = heartsw_measures[measure]
+        if not common:
+            return comparison
 
-                diff = abs(hp_val - hsw_val)
-                pct_diff = ResultComparator.calculate_percentage_difference(hp_val, hsw_val)
+        # Extract both sides into aligned float arrays and compare in one pass
+        hp_vals = np.fromiter((heartpy_measures[m] for m in common), dtype=np.float64, count=len(common))
+        hsw_vals = np.fromiter((heartsw_measures[m] for m in common), dtype=np.float64, count=len(common))
 
-                comparison[measure] = {
-                    'heartpy': hp_val,
-                    'heartsw': hsw_val,
-                    'difference': diff,
-                    'percentage_difference': pct_diff,
-                    'within_tolerance': pct_diff <= 5.0  # 5% tolerance
-                }
+        diffs = np.abs(hp_vals - hsw_vals)
+        pct_diffs = ResultComparator.calculate_percentage_difference(hp_vals, hsw_vals)
+
+        # 5% tolerance relative to HeartPy's value, i.e. |hsw - hp| <= 0.05 * |hp|
+        within_tolerance = np.isclose(hsw_vals, hp_vals, rtol=0.05, atol=0.0)
+
+        for i, measure in enumerate(common):
+            comparison[measure] = {
+                'heartpy': heartpy_measures[measure],
+                'heartsw': heartsw_measures[measure],
+                'difference': float(diffs[i]),
+                'percentage_difference': float(pct_diffs[i]),
+                'within_tolerance': bool(within_tolerance[i])
+            }
 
         return comparison
 
@@ -15,6 +15,12 @@ setup(
             "pytest-cov",
             "heartpy",  # Optional for comparison
         ],
+        "msgpack": [
+            "msgspec",  # Optional MessagePack result files
+        ],
+        "json": [
+            "orjson",  # Optional faster save_to_json
+        ],
     },
     python_requires=">=3.7",
     description="Object-oriented heart rate analysis toolkit",
@@ -2,10 +2,13 @@
 Tests for core HeartOO components.
 """
 
+import json
+
 import pytest
 import numpy as np
 
 from heartoo.core.signal import Signal, HeartRateSignal
+import heartoo.core.result as result_module
 from heartoo.core.result import AnalysisResult
 
 
@@ -61,6 +64,10 @@ class TestSignal:
         # Check time axis
         expected = np.array([0.0, 0.5, 1.0, 1.5, 2.0])
         assert np.allclose(time_axis, expected)
+        
+        # Single samples can be looked up without the full axis
+        assert signal.time_at(3) == 1.5
+        assert np.array_equal(signal.time_at([1, 4]), [0.5, 2.0])
     
     def test_signal_length(self):
         """Test Signal length."""
@@ -80,6 +87,15 @@ class TestSignal:
         # Test slice indexing
         assert np.array_equal(signal[1:4], data[1:4])
     
+    def test_signal_dtype(self):
+        """Test Signal storage dtype."""
+        data = np.array([1.5, 2.5, 3.5])
+        
+        # Data dtype is kept by default and converted when requested
+        assert Signal(data, 100.0).data.dtype == np.float64
+        assert Signal(data, 100.0, dtype=np.float32).data.dtype == np.float32
+        assert Signal(data, 100.0, dtype=np.float32).as_float64().dtype == np.float64
+    
     def test_invalid_sample_rate(self):
         """Test invalid sample rate handling."""
         with pytest.raises(ValueError):
@@ -130,6 +146,8 @@ class TestHeartRateSignal:
         # Check RR indices
         expected_indices = [(1, 3), (3, 5), (5, 7), (7, 9)]
         assert signal.rr_indices == expected_indices
+        assert np.array_equal(signal.rr_starts, [1, 3, 5, 7])
+        assert np.array_equal(signal.rr_ends, [3, 5, 7, 9])
     
     def test_heart_rate_calculation(self):
         """Test heart rate calculation."""
@@ -141,6 +159,16 @@ class TestHeartRateSignal:
         # Check heart rate
         assert signal.get_heart_rate() == 60.0
     
+    def test_from_rr(self):
+        """Test creating a signal from RR intervals."""
+        rr_list = [1000, 900, 1100]
+        signal = HeartRateSignal.from_rr(rr_list)
+        
+        # Length spans the RR duration without allocating the samples
+        assert len(signal) == 3000
+        assert signal.data.strides == (0,)
+        assert np.array_equal(signal.rr_intervals, rr_list)
+    
     def test_scale_data(self):
         """Test scaling data."""
         data = np.array([1, 2, 3, 4, 5])
@@ -201,6 +229,18 @@ class TestAnalysisResult:
         # Get non-existent working data with default
         assert result.get_working_data("non_existent", []) == []
     
+    def test_bulk_update(self):
+        """Test setting several measures and working data entries at once."""
+        result = AnalysisResult()
+        result.set_measure("bpm", 50.0)
+        
+        # Bulk updates overwrite existing keys and add new ones
+        result.bulk_update_measures({"bpm": 60.0, "sdnn": 40.0})
+        result.bulk_update_working_data({"peaklist": [1, 2, 3]})
+        
+        assert result.measures == {"bpm": 60.0, "sdnn": 40.0}
+        assert result.get_working_data("peaklist") == [1, 2, 3]
+    
     def test_segments(self):
         """Test segment operations."""
         result = AnalysisResult()
@@ -216,6 +256,42 @@ class TestAnalysisResult:
         assert len(result.segments) == 1
         assert result.segments[0].get_measure("bpm") == 60.0
     
+    def test_as_segment_soa(self):
+        """Test segment measures as per-measure arrays."""
+        result = AnalysisResult()
+        for bpm in [60.0, 70.0]:
+            segment = AnalysisResult()
+            segment.set_measure("bpm", bpm)
+            result.add_segment(segment)
+        result.segments[1].set_measure("sdnn", 40.0)
+        
+        # Missing measures are NaN
+        soa = result.as_segment_soa()
+        assert np.array_equal(soa["bpm"], [60.0, 70.0])
+        assert np.isnan(soa["sdnn"][0]) and soa["sdnn"][1] == 40.0
+        
+        # Adding a segment rebuilds the arrays
+        result.add_segment(AnalysisResult())
+        assert len(result.as_segment_soa()["bpm"]) == 3
+        
+        # So do changes to a segment, or to the segments list itself
+        result.segments[0].set_measure("bpm", 99.0)
+        replacement = AnalysisResult()
+        replacement.set_measure("bpm", 80.0)
+        result.segments[1] = replacement
+        assert np.array_equal(result.as_segment_soa()["bpm"], [99.0, 80.0, np.nan], equal_nan=True)
+        
+        # Edits to the returned arrays do not leak into later calls
+        result.as_segment_soa()["bpm"][0] = 0.0
+        assert result.as_segment_soa()["bpm"][0] == 99.0
+        
+        # Non-numeric values are NaN, even when they look like numbers
+        result.segments[2].set_measure("bpm", "75")
+        result.segments[2].set_measure("sdnn", np.float32(20.0))
+        soa = result.as_segment_soa()
+        assert np.isnan(soa["bpm"][2])
+        assert soa["sdnn"][2] == 20.0
+    
     def test_get_measures_by_category(self):
         """Test getting measures by category."""
         result = AnalysisResult()
@@ -232,6 +308,16 @@ class TestAnalysisResult:
         assert len(hrv_measures) == 2
         assert hrv_measures["hrv_sdnn"] == 50.0
         assert hrv_measures["hrv_rmssd"] == 30.0
+        
+        # Measures added later are included
+        result.set_measure("hrv_pnn50", 0.2)
+        assert len(result.get_measures_by_category("hrv_")) == 3
+        
+        # So are direct edits of the measures dict that keep its size
+        del result.measures["hrv_rmssd"]
+        result.measures["hrv_sd1"] = 20.0
+        assert result.get_measures_by_category("hrv_") == {
+            "hrv_sdnn": 50.0, "hrv_pnn50": 0.2, "hrv_sd1": 20.0}
     
     def test_to_dict(self):
         """Test converting result to dictionary."""
@@ -306,4 +392,158 @@ class TestAnalysisResult:
         assert result.get_measure("bpm") == 60.0
         assert result.get_measure("sdnn") == 50.0
         assert result.get_working_data("peaks") == [1, 2, 3]
-        assert result.get_working_data("rr_intervals") == [1000, 1000]
\ No newline at end of file
+        assert result.get_working_data("rr_intervals") == [1000, 1000]
+    
+    def test_compare_with_numpy_values(self):
+        """Test comparing NumPy scalars and 0-d arrays."""
+        result1 = AnalysisResult()
+        result2 = AnalysisResult()
+        
+        # 0-d arrays on both sides compare as scalars
+        result1.set_measure("bpm", np.array(1.0))
+        result2.set_measure("bpm", np.array(1.0))
+        
+        # A NumPy scalar equals a 0-d array holding the same value
+        result1.set_measure("sdnn", np.float64(1.0))
+        result2.set_measure("sdnn", np.array(1.0))
+        
+        # NumPy scalars are compared within the tolerance
+        result1.set_measure("rmssd", np.float32(30.0))
+        result2.set_measure("rmssd", np.float32(30.000004))
+        
+        comparison = result1.compare_with(result2, tolerance=1e-5)
+        assert sorted(comparison["identical_measures"]) == ["bpm", "rmssd", "sdnn"]
+        assert comparison["different_measures"] == []
+        
+        result2.set_measure("rmssd", np.float32(31.0))
+        comparison = result1.compare_with(result2, tolerance=1e-5)
+        assert comparison["different_measures"] == ["rmssd"]
+    
+    def test_compare_with_ragged_values(self):
+        """Test comparing ragged lists, which NumPy cannot turn into arrays."""
+        result1 = AnalysisResult()
+        result2 = AnalysisResult()
+        
+        result1.set_measure("segments", [[1, 2], [3]])
+        result2.set_measure("segments", [[1, 2], [3]])
+        result1.set_measure("shifted", [[1.0, 2.0], [3.0]])
+        result2.set_measure("shifted", [[1.0, 2.0], [3.5]])
+        result1.set_measure("shorter", [[1, 2], [3]])
+        result2.set_measure("shorter", [[1, 2]])
+        
+        comparison = result1.compare_with(result2)
+        assert comparison["identical_measures"] == ["segments"]
+        assert sorted(comparison["different_measures"]) == ["shifted", "shorter"]
+    
+    def test_json_array_sidecars(self, tmp_path):
+        """Test saving large working data arrays next to the JSON file."""
+        result = AnalysisResult()
+        result.set_measure("bpm", 60.0)
+        result.set_working_data("hr", np.arange(1000, dtype=np.float64))
+        result.set_working_data("peaklist", np.array([10, 20, 30]))
+        
+        filepath = tmp_path / "result.json"
+        result.save_to_json(filepath, array_threshold=4096)
+        loaded = AnalysisResult.load_from_json(filepath)
+        
+        # Only the large array is written separately
+        assert (tmp_path / "result.hr.npy").exists()
+        assert not (tmp_path / "result.peaklist.npy").exists()
+        assert np.array_equal(loaded.get_working_data("hr"), np.arange(1000))
+        assert np.array_equal(loaded.get_working_data("peaklist"), [10, 20, 30])
+        
+        # Large arrays can be memory-mapped instead of read
+        mapped = AnalysisResult.load_from_json(filepath, mmap_mode="r")
+        assert isinstance(mapped.get_working_data("hr"), np.memmap)
+    
+    def test_json_restores_arrays(self, tmp_path):
+        """Test that arrays saved to JSON load back as arrays."""
+        result = AnalysisResult()
+        result.set_working_data("RR_list", np.array([800.0, 810.0], dtype=np.float32))
+        result.set_working_data("ybeat", [1.5, 2.5])
+        
+        filepath = tmp_path / "result.json"
+        result.save_to_json(filepath)
+        loaded = AnalysisResult.load_from_json(filepath)
+        
+        # The file stays human-readable
+        assert '\n  "measures"' in filepath.read_text()
+        
+        # Arrays keep their dtype, lists stay lists
+        assert loaded.get_working_data("RR_list").dtype == np.float32
+        assert loaded.get_working_data("ybeat") == [1.5, 2.5]
+    
+    def test_json_keeps_nan(self, tmp_path):
+        """Test that NaN and infinite values survive a JSON round trip."""
+        result = AnalysisResult()
+        result.set_measure("sdnn", np.nan)
+        result.set_measure("lf/hf", np.inf)
+        result.set_working_data("RR_list", np.array([800.0, np.nan]))
+        
+        filepath = tmp_path / "result.json"
+        result.save_to_json(filepath)
+        loaded = AnalysisResult.load_from_json(filepath)
+        
+        assert np.isnan(loaded.get_measure("sdnn"))
+        assert loaded.get_measure("lf/hf") == np.inf
+        assert np.isnan(loaded.get_working_data("RR_list")[1])
+    
+    def test_json_encoders_agree(self, tmp_path, monkeypatch):
+        """Test that orjson and the json module write the same values."""
+        pytest.importorskip("orjson")
+        
+        result = AnalysisResult()
+        result.set_measure("bpm", np.float32(0.1))
+        result.set_measure("count", np.int64(3))
+        result.set_working_data("RR_list", np.array([0.1, 800.5], dtype=np.float32))
+        result.set_working_data("half", np.array([0.1], dtype=np.float16))
+        result.set_working_data("by_beat", {1: [np.float32(0.2), 2.5], 2: "x"})
+        
+        def save_both(name):
+            filepath = tmp_path / (name + ".orjson.json")
+            result.save_to_json(filepath)
+            with monkeypatch.context() as m:
+                m.setattr(result_module, "orjson", None)
+                result.save_to_json(tmp_path / (name + ".json"))
+            with open(filepath) as f1, open(tmp_path / (name + ".json")) as f2:
+                return json.load(f1), json.load(f2)
+        
+        with_orjson, with_json = save_both("finite")
+        assert with_orjson == with_json
+        assert with_json["measures"]["bpm"] == 0.1
+        assert with_json["working_data"]["RR_list"] == [0.1, 800.5]
+        assert with_json["working_data"]["by_beat"] == {"1": [0.2, 2.5], "2": "x"}
+        
+        # NaN is kept by both
+        result.set_measure("sdnn", np.nan)
+        with_orjson, with_json = save_both("nan")
+        np.testing.assert_equal(with_orjson, with_json)
+        assert np.isnan(with_orjson["measures"]["sdnn"])
+    
+    def test_msgpack_round_trip(self, tmp_path):
+        """Test saving and loading a result as MessagePack."""
+        pytest.importorskip("msgspec")
+        result = AnalysisResult()
+        result.set_measure("bpm", np.float64(60.0))
+        result.set_working_data("peaklist", np.array([10, 20, 30]))
+        result.set_working_data("ybeat", [1.5, 2.5])
+        
+        filepath = tmp_path / "result.mpk"
+        result.save_to_msgpack(filepath)
+        loaded = AnalysisResult.load_from_msgpack(filepath)
+        
+        # Arrays keep their dtype and values
+        assert loaded.get_measure("bpm") == 60.0
+        peaklist = loaded.get_working_data("peaklist")
+        assert peaklist.dtype == np.array([10, 20, 30]).dtype
+        assert np.array_equal(peaklist, [10, 20, 30])
+        assert loaded.get_working_data("ybeat") == [1.5, 2.5]
+        
+        # The same format is available as bytes
+        decoded = AnalysisResult.from_msgpack(result.to_msgpack())
+        assert np.array_equal(decoded.get_working_data("peaklist"), [10, 20, 30])
+        
+        # MessagePack files can be compared with JSON files
+        result.save_to_json(tmp_path / "result.json")
+        comparison = AnalysisResult.compare_json_files(filepath, tmp_path / "result.json")
+        assert comparison["identical_measures"] == ["bpm"]
\ No newline at end of file
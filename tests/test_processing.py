@@ -0,0 +1,383 @@
+"""
+Tests for HeartOO processing components.
+"""
+
+import pytest
+import numpy as np
+from scipy.signal import butter, filtfilt, sosfiltfilt
+
+from heartoo.core.result import AnalysisResult
+from heartoo.core.signal import HeartRateSignal
+from heartoo.compatibility import process_rr
+import heartoo.processing.peak_detectors as peak_detectors
+from heartoo.processing.peak_detectors import AdaptiveThresholdPeakDetector
+from heartoo.processing.builder import PipelineBuilder
+from heartoo.processing.filters import ButterworthFilter, HampelFilter, _hampel, _hampel_windowed
+from heartoo.processing.analyzers import (
+    TimeDomainAnalyzer,
+    RRStatisticsAnalyzer,
+    FrequencyDomainAnalyzer,
+    NonlinearAnalyzer,
+    BreathingAnalyzer,
+    _rr_interpolator
+)
+
+
+class TestAnalyzers:
+    """Tests for the HRV analyzers."""
+    
+    def test_rr_statistics_matches_separate_analyzers(self):
+        """Test that the combined analyzer equals the time-domain and nonlinear ones."""
+        rr_intervals = np.random.default_rng(0).normal(800.0, 50.0, 300)
+        signal = HeartRateSignal.from_rr(rr_intervals)
+        
+        time_domain = TimeDomainAnalyzer().calculate_measures(signal, rr_intervals)
+        nonlinear = NonlinearAnalyzer().calculate_measures(signal, rr_intervals)
+        combined = RRStatisticsAnalyzer().calculate_measures(signal, rr_intervals)
+        
+        # Each analyzer only returns its own measures
+        assert list(time_domain) == ['bpm', 'ibi', 'sdnn', 'sdsd', 'rmssd', 'pnn20', 'pnn50', 'hr_mad']
+        assert list(nonlinear) == ['sd1', 'sd2', 's', 'sd1/sd2']
+        assert combined == {**time_domain, **nonlinear}
+    
+    def test_frequency_domain_accepts_list(self):
+        """Test that the frequency-domain analyzer accepts RR intervals as a list."""
+        rr_intervals = np.random.default_rng(0).normal(800.0, 50.0, 300)
+        signal = HeartRateSignal.from_rr(rr_intervals)
+        analyzer = FrequencyDomainAnalyzer()
+        
+        expected = analyzer.calculate_measures(signal, rr_intervals)
+        result = analyzer.calculate_measures(signal, rr_intervals.tolist())
+        np.testing.assert_equal(result, expected)
+        assert np.isfinite(result['lf/hf'])
+
+
+def _reference_hampel(data, half_window, threshold, recursive=True):
+    """Plain per-sample Hampel filter, recomputing median and MAD for every window."""
+    data = np.array(data, dtype=np.float64)
+    source = data if recursive else data.copy()
+    n = len(data)
+    for i in range(n):
+        window = source[max(0, i - half_window):min(n, i + half_window + 1)]
+        median = np.median(window)
+        mad = np.median(np.abs(window - median))
+        if mad == 0:
+            mad = np.mean(np.abs(window - median))
+            if mad == 0:
+                mad = 1e-10
+        if np.abs(source[i] - median) > threshold * mad:
+            data[i] = median
+    return data
+
+
+def _hampel_cases():
+    """Random signals covering plain noise, ties (MAD == 0), spikes and NaNs."""
+    rng = np.random.RandomState(0)
+    for trial in range(200):
+        n = rng.randint(1, 60)
+        half_window = rng.randint(0, 7)
+        kind = trial % 4
+        if kind == 0:
+            data = rng.randn(n)
+        elif kind == 1:
+            data = rng.randint(0, 4, n).astype(float)
+        elif kind == 2:
+            data = rng.randn(n)
+            data[rng.rand(n) < 0.2] *= 30
+        else:
+            data = rng.randn(n)
+            data[rng.rand(n) < 0.1] = np.nan
+        yield data, half_window
+
+
+class TestHampelFilter:
+    """Tests for the Hampel filter kernels."""
+    
+    def test_recursive_matches_reference(self):
+        """Test the sorted-buffer kernel against per-sample medians."""
+        # Check the plain Python loop as well when the kernel is compiled
+        kernels = [_hampel, getattr(_hampel, 'py_func', _hampel)]
+        for data, half_window in _hampel_cases():
+            expected = _reference_hampel(data, half_window, 3.0)
+            for kernel in kernels:
+                result = kernel(data.copy(), half_window, 3.0)
+                np.testing.assert_array_equal(result, expected)
+    
+    def test_recursive_edge_cases(self):
+        """Test constant windows, a single outlier and signals shorter than the window."""
+        # MAD and mean deviation both zero: nothing but the spike is replaced
+        data = np.array([1.0, 1.0, 1.0, 1.0, 50.0, 1.0, 1.0, 1.0, 1.0])
+        np.testing.assert_array_equal(_hampel(data.copy(), 3, 3.0), np.ones(9))
+        
+        # MAD zero but mean deviation not: the tie-breaking fallback is used
+        data = np.array([2.0, 2.0, 2.0, 2.0, 2.0, 3.0, 2.0])
+        np.testing.assert_array_equal(_hampel(data.copy(), 3, 3.0),
+                                      _reference_hampel(data, 3, 3.0))
+        
+        # Shorter than the window, and empty
+        data = np.array([1.0, 8.0, 1.5])
+        np.testing.assert_array_equal(_hampel(data.copy(), 5, 1.0),
+                                      _reference_hampel(data, 5, 1.0))
+        assert len(_hampel(np.array([]), 5, 3.0)) == 0
+        
+        # A NaN in the window leaves its samples untouched
+        data = np.array([1.0, 1.0, np.nan, 1.0, 50.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+        result = _hampel(data.copy(), 2, 3.0)
+        assert result[4] == 50.0
+        np.testing.assert_array_equal(result, _reference_hampel(data, 2, 3.0))
+    
+    def test_windowed_matches_reference(self):
+        """Test the vectorized filter against per-sample medians of the original data."""
+        for data, half_window in _hampel_cases():
+            expected = _reference_hampel(data, half_window, 3.0, recursive=False)
+            # A small chunk size puts chunk boundaries inside these short signals
+            for chunk_size in (65536, 1, 7):
+                result = _hampel_windowed(data, half_window, 3.0, chunk_size=chunk_size)
+                np.testing.assert_array_equal(result, expected)
+    
+    def test_windowed_chunk_boundary(self):
+        """Test the default chunk size across its boundary."""
+        rng = np.random.RandomState(1)
+        data = rng.randn(65536 + 100)
+        data[rng.rand(len(data)) < 0.05] *= 20
+        data[65536 + 3] = 100.0
+        half_window = 5
+        signal = HeartRateSignal(data, 100.0)
+        
+        result = HampelFilter(window_size=2 * half_window, recursive=False).apply_filter(signal).data
+        
+        # Windows are taken from the original data, so any stretch can be checked on its own
+        start, stop = 65536 - 50, len(data)
+        expected = _reference_hampel(data[start - half_window:stop], half_window, 3.0,
+                                     recursive=False)[half_window:]
+        np.testing.assert_array_equal(result[start:stop], expected)
+        assert result[65536 + 3] != 100.0
+        np.testing.assert_array_equal(signal.data, data)
+
+
+class TestPeakDetection:
+    """Tests for the adaptive threshold peak detector."""
+    
+    def test_jit_matches_vectorized(self, monkeypatch):
+        """Test that the segment scan and the vectorized path find the same peaks."""
+        detector = AdaptiveThresholdPeakDetector()
+        rng = np.random.default_rng(1)
+        kernels = [peak_detectors._run_peaks]
+        if peak_detectors._run_peaks_jit is not None:
+            kernels.append(peak_detectors._run_peaks_jit)
+        
+        for trial in range(100):
+            n = int(rng.integers(1, 3000))
+            # Rounded values give plateaus and repeated maxima within a segment
+            data = np.round(rng.normal(0, 50, n) + np.sin(np.arange(n) / rng.uniform(3, 20)) ** 15 * 500)
+            rol_mean = detector._calculate_rolling_mean(data, 0.75, 100.0)
+            for ma_perc in (5, 20, 100, rng.uniform(0, 200)):
+                monkeypatch.setattr(peak_detectors, '_run_peaks_jit', None)
+                expected = detector._detect_with_threshold(data, rol_mean, ma_perc)
+                monkeypatch.undo()
+                
+                threshold = rol_mean + np.mean(rol_mean / 100) * ma_perc
+                for kernel in kernels:
+                    assert kernel(data, threshold).tolist() == expected
+                assert detector._detect_with_threshold(data, rol_mean, ma_perc) == expected
+        
+        # No samples above the threshold, and all of them (one segment, first maximum)
+        data = np.ones(50)
+        for threshold, expected in ((np.full(50, 2.0), []), (np.zeros(50), [0])):
+            monkeypatch.setattr(peak_detectors, '_run_peaks_jit', None)
+            assert detector._detect_with_threshold(data, threshold, 0.0) == expected
+            monkeypatch.undo()
+            for kernel in kernels:
+                assert kernel(data, threshold).tolist() == expected
+    
+    def test_fit_peaks_threshold(self, sample_signal):
+        """Test the chosen threshold, the wider BPM retry and the fallback."""
+        data, sample_rate = sample_signal
+        # Shifted positive, like a PPG signal, so the thresholds differ
+        shifted = data + 2.0
+        
+        def fit(detector, x):
+            rol_mean = detector._calculate_rolling_mean(x, 0.75, sample_rate)
+            ma_perc, peaks = detector._fit_peaks(x, rol_mean, sample_rate)
+            assert peaks == detector._detect_with_threshold(x, rol_mean, ma_perc)
+            return ma_perc, peaks
+        
+        # 15% is the most regular threshold within 40-180 BPM (10% gives 246 BPM)
+        ma_perc, peaks = fit(AdaptiveThresholdPeakDetector(), shifted)
+        assert ma_perc == 15
+        assert len(peaks) == 23
+        
+        # Nothing within 150-180 BPM, so 30-200 BPM is tried without
+        # changing the detector's own bounds
+        detector = AdaptiveThresholdPeakDetector(min_bpm=150, max_bpm=180)
+        assert fit(detector, shifted) == (ma_perc, peaks)
+        assert (detector.min_bpm, detector.max_bpm) == (150, 180)
+        
+        # The unshifted signal gives over 200 BPM for every threshold: HeartPy's 20% is used
+        ma_perc, peaks = fit(AdaptiveThresholdPeakDetector(), data)
+        assert ma_perc == 20
+        assert len(peaks) == 47
+    
+    def test_rr_masklist_dtype(self, sample_signal):
+        """Test that RR_masklist has the same dtype from peak detection and from process_rr."""
+        data, sample_rate = sample_signal
+        result = AdaptiveThresholdPeakDetector().process(HeartRateSignal(data + 2.0, sample_rate))
+        assert result.get_working_data('RR_masklist').dtype == np.int64
+        
+        working_data, _ = process_rr([1000, 900, 1100, 950, 1050, 1000, 950])
+        assert working_data['RR_masklist'].dtype == np.int64
+
+
+class TestButterworthFilter:
+    """Tests for the Butterworth filter."""
+    
+    def test_sos_matches_scipy(self, sample_signal):
+        """Test that sos=True matches scipy's sosfiltfilt."""
+        data, sample_rate = sample_signal
+        signal = HeartRateSignal(data, sample_rate)
+        nyq = 0.5 * sample_rate
+        
+        for cutoff, filtertype in ((3.0, 'lowpass'), (0.5, 'highpass'), ([0.7, 3.5], 'bandpass')):
+            wn = [cf / nyq for cf in cutoff] if isinstance(cutoff, list) else cutoff / nyq
+            
+            result = ButterworthFilter(cutoff, filtertype, order=2, sos=True).apply_filter(signal)
+            expected = sosfiltfilt(butter(2, wn, btype=filtertype, output='sos'), data)
+            np.testing.assert_allclose(result.data, expected, rtol=1e-12, atol=1e-12)
+            
+            # The default (b, a) form is left exactly as HeartPy computes it
+            result = ButterworthFilter(cutoff, filtertype, order=2).apply_filter(signal)
+            b, a = butter(2, wn, btype=filtertype)
+            np.testing.assert_array_equal(result.data, filtfilt(b, a, data))
+    
+    def test_array_cutoff(self, sample_signal):
+        """Test that an ndarray cutoff filters like the equivalent list."""
+        data, sample_rate = sample_signal
+        signal = HeartRateSignal(data, sample_rate)
+        
+        for sos in (False, True):
+            expected = ButterworthFilter([0.5, 5.0], 'bandpass', sos=sos).apply_filter(signal)
+            result = ButterworthFilter(np.array([0.5, 5.0]), 'bandpass', sos=sos).apply_filter(signal)
+            np.testing.assert_array_equal(result.data, expected.data)
+            
+            expected = ButterworthFilter(3.0, 'lowpass', sos=sos).apply_filter(signal)
+            result = ButterworthFilter(np.float64(3.0), 'lowpass', sos=sos).apply_filter(signal)
+            np.testing.assert_array_equal(result.data, expected.data)
+    
+    def test_short_segment(self, sample_signal):
+        """Test that segments shorter than scipy's default padding are still filtered."""
+        data, sample_rate = sample_signal
+        short = data[:10]
+        wn = 3.0 / (0.5 * sample_rate)
+        
+        # scipy's default padding (3 * 5 taps) does not fit in 10 samples
+        b, a = butter(4, wn, btype='lowpass')
+        with pytest.raises(ValueError):
+            filtfilt(b, a, short)
+        
+        result = ButterworthFilter(3.0, 'lowpass', order=4).apply_filter(HeartRateSignal(short, sample_rate))
+        np.testing.assert_array_equal(result.data, filtfilt(b, a, short, padlen=9))
+        
+        sos = butter(4, wn, btype='lowpass', output='sos')
+        result = ButterworthFilter(3.0, 'lowpass', order=4, sos=True).apply_filter(HeartRateSignal(short, sample_rate))
+        np.testing.assert_allclose(result.data, sosfiltfilt(sos, short, padlen=9), rtol=1e-12, atol=1e-12)
+
+
+class TestSegmentedPipeline:
+    """Tests for segmented processing."""
+    
+    def test_parallel_matches_serial(self):
+        """Test that n_workers > 1 gives the same segments, in the same order."""
+        sample_rate = 100.0
+        t = np.arange(0, 180, 1 / sample_rate)
+        # Heart rate drifts from 60 to 100 BPM, so every segment is different
+        phase = 2 * np.pi * np.cumsum(1.0 + t / 270) / sample_rate
+        data = 500 + 200 * np.sin(phase) ** 9 + np.random.RandomState(3).normal(0, 5, len(t))
+        signal = HeartRateSignal(data, sample_rate)
+        
+        def run(n_workers):
+            pipeline = (PipelineBuilder()
+                        .with_peak_detector()
+                        .with_time_domain_analyzer()
+                        .with_nonlinear_analyzer()
+                        .with_segmenter(segment_width=20, segment_overlap=0.5, segment_min_size=5)
+                        .with_parallelism(n_workers)
+                        .build())
+            return pipeline.process(signal)
+        
+        serial = run(1)
+        parallel = run(4)
+        
+        assert len(serial.segments) == 17
+        assert parallel.get_working_data('segment_indices') == serial.get_working_data('segment_indices')
+        for serial_segment, parallel_segment in zip(serial.segments, parallel.segments):
+            assert list(parallel_segment.measures) == list(serial_segment.measures)
+            np.testing.assert_equal(parallel_segment.measures, serial_segment.measures)
+        np.testing.assert_equal(parallel.measures, serial.measures)
+        assert len(set(serial.measures['bpm'])) == len(serial.segments)
+
+
+def _breathing_result(**kwargs):
+    """Run BreathingAnalyzer on RR intervals modulated at 0.25 Hz (15 breaths/min)."""
+    beat_times = np.cumsum(np.full(300, 0.8))
+    rr_intervals = 800 + 50 * np.sin(2 * np.pi * 0.25 * beat_times)
+    result = AnalysisResult()
+    result.set_working_data('RR_list_cor', rr_intervals)
+    return BreathingAnalyzer(**kwargs).process(HeartRateSignal(np.zeros(10), 100.0), result)
+
+
+class TestBreathingAnalyzer:
+    """Tests for the breathing rate analyzer."""
+    
+    def test_resample_rate(self):
+        """Test that a lower resample rate gives the same breathing rate on fewer samples."""
+        default = _breathing_result()
+        for method in ('welch', 'fft', 'periodogram'):
+            result = _breathing_result(method=method, resample_rate=10.0)
+            assert result.get_measure('breathingrate') == default.get_measure('breathingrate') == 0.25
+            # 240 seconds of RR intervals
+            assert len(result.get_working_data('breathing_signal')) == 2400
+        assert len(default.get_working_data('breathing_signal')) == 240000
+    
+    def test_dtype(self):
+        """Test that dtype narrows the spectrum without changing the breathing rate."""
+        for method in ('welch', 'fft', 'periodogram'):
+            default = _breathing_result(method=method, resample_rate=10.0)
+            result = _breathing_result(method=method, resample_rate=10.0, dtype=np.float32)
+            assert result.get_working_data('breathing_signal').dtype == np.float32
+            assert result.get_working_data('breathing_psd').dtype == np.float32
+            assert default.get_working_data('breathing_psd').dtype == np.float64
+            assert result.get_measure('breathingrate') == default.get_measure('breathingrate')
+            np.testing.assert_allclose(result.get_working_data('breathing_psd'),
+                                       default.get_working_data('breathing_psd'),
+                                       rtol=1e-3, atol=1e-6 * default.get_working_data('breathing_psd').max())
+    
+    def test_cubic_interpolation(self):
+        """Test the natural cubic spline against HeartPy's smoothing spline."""
+        default = _breathing_result(resample_rate=10.0)
+        result = _breathing_result(resample_rate=10.0, interpolation='cubic')
+        assert result.get_measure('breathingrate') == default.get_measure('breathingrate')
+        
+        # The cubic spline passes through every RR interval
+        rr_intervals = np.array([800.0, 850.0, 780.0, 820.0, 900.0, 760.0])
+        x = np.linspace(0, len(rr_intervals), len(rr_intervals))
+        np.testing.assert_allclose(_rr_interpolator(x, rr_intervals, 'cubic')(x), rr_intervals)
+        
+        # An unknown interpolation gives no breathing rate
+        assert np.isnan(_breathing_result(interpolation='linear').get_measure('breathingrate'))
+    
+    def test_sos_filter(self):
+        """Test second-order-section filtering of the breathing signal."""
+        default = _breathing_result(resample_rate=10.0)
+        result = _breathing_result(resample_rate=10.0, sos=True)
+        assert result.get_measure('breathingrate') == default.get_measure('breathingrate')
+        
+        # Same filter, computed in a different form
+        np.testing.assert_allclose(result.get_working_data('breathing_signal'),
+                                   default.get_working_data('breathing_signal'), rtol=0, atol=1e-6)
+        
+        # The unfiltered signal matches the sosfiltfilt of it
+        unfiltered = _breathing_result(resample_rate=10.0, filter_breathing=False)
+        sos = butter(2, [0.1 / 5.0, 0.4 / 5.0], btype='band', output='sos')
+        np.testing.assert_allclose(result.get_working_data('breathing_signal'),
+                                   sosfiltfilt(sos, unfiltered.get_working_data('breathing_signal')),
+                                   rtol=1e-12, atol=1e-9)